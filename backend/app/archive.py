@@ -0,0 +1,195 @@
+"""
+Columnar archive of old predictions
+
+Rows older than the retention window are moved out of the predictions table
+into Hive-partitioned files under ARCHIVE_DIR:
+
+    created_month=2025-01/part-<first id>-<last id>.parquet   (or .arrow)
+
+Files are written before their rows are deleted, and are named by id range, so
+an interrupted run that is repeated rewrites the same files instead of
+duplicating rows. Arrow IPC files are written uncompressed so they can be
+memory-mapped without a decode step; Parquet files are zstd-compressed.
+
+pyarrow is only imported by the functions that need it.
+"""
+
+import os
+from collections import defaultdict
+from pathlib import Path
+from sqlalchemy import delete, select
+from models import db, User, Prediction
+from schema import FEATURE_NAMES
+
+ARCHIVE_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+PARTITION_COLUMN = 'created_month'
+RESULT_COLUMNS = ('prediction', 'risk_percentage', 'risk_level', 'confidence', 'model_version')
+LABEL_COLUMNS = ('outcome',)
+# Request metadata (IP address, user agent) is deliberately not archived
+ARCHIVE_COLUMNS = (
+    ('id', 'public_id', 'user_id', 'session_id', 'created_at') + tuple(FEATURE_NAMES) + RESULT_COLUMNS + LABEL_COLUMNS
+)
+
+# Rows per DELETE statement, below SQLite's bound-parameter limit
+DELETE_CHUNK = 900
+
+
+def archive_schema():
+    """Arrow schema of archived rows (without the partition column)"""
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ('id', pa.int64()),
+            ('public_id', pa.string()),
+            ('user_id', pa.int64()),
+            ('session_id', pa.string()),
+            ('created_at', pa.timestamp('us'))
+        ]
+        + [(name, pa.float64()) for name in FEATURE_NAMES]
+        + [
+            ('prediction', pa.int8()),
+            ('risk_percentage', pa.float64()),
+            ('risk_level', pa.string()),
+            ('confidence', pa.float64()),
+            ('model_version', pa.string()),
+            # Files written before outcomes were recorded read back with nulls here
+            ('outcome', pa.int8())
+        ]
+    )
+
+
+def archive_predictions(archive_dir, older_than, archive_format='parquet', batch_size=50000):
+    """Move predictions created before `older_than` into the archive; the rollup is left as is"""
+    import pyarrow as pa
+
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f'Unknown archive format: {archive_format}')
+
+    archive_dir = Path(archive_dir)
+    schema = archive_schema()
+    table = Prediction.__table__
+    columns = [User.__table__.c.session_id if name == 'session_id' else table.c[name] for name in ARCHIVE_COLUMNS]
+    query = (
+        select(*columns)
+        .join(User.__table__, User.__table__.c.id == table.c.user_id)
+        .where(table.c.created_at < older_than)
+        .order_by(table.c.created_at, table.c.id)
+        .limit(batch_size)
+    )
+
+    archived = 0
+    files = []
+    while True:
+        # Each batch is deleted once written, so the oldest remaining rows are always next
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+
+        partitions = defaultdict(list)
+        for row in rows:
+            partitions[row.created_at.strftime('%Y-%m')].append(row)
+
+        for month, partition_rows in sorted(partitions.items()):
+            arrays = [
+                pa.array(values, type=schema.field(name).type)
+                for name, values in zip(ARCHIVE_COLUMNS, zip(*partition_rows))
+            ]
+            path = _write_part(archive_dir, month, pa.Table.from_arrays(arrays, schema=schema), archive_format)
+            files.append(str(path))
+
+        ids = [row.id for row in rows]
+        for start in range(0, len(ids), DELETE_CHUNK):
+            db.session.execute(delete(table).where(table.c.id.in_(ids[start:start + DELETE_CHUNK])))
+        db.session.commit()
+        archived += len(rows)
+
+    return {'rows': archived, 'files': files}
+
+
+def _write_part(archive_dir, month, arrow_table, archive_format):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    ids = arrow_table.column('id')
+    partition_dir = archive_dir / f'{PARTITION_COLUMN}={month}'
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    path = partition_dir / f'part-{ids[0].as_py()}-{ids[len(ids) - 1].as_py()}{ARCHIVE_FORMATS[archive_format]}'
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    if archive_format == 'parquet':
+        pq.write_table(arrow_table, tmp_path, compression='zstd')
+    else:
+        feather.write_feather(arrow_table, tmp_path, compression='uncompressed')
+    # Make the file durable before the rows it holds are deleted
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def open_archive(archive_dir):
+    """A pyarrow dataset over every archived file, read through memory maps; None if empty"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    archive_dir = Path(archive_dir)
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+    schema = archive_schema().append(pa.field(PARTITION_COLUMN, pa.string()))
+
+    datasets = []
+    for archive_format, suffix in ARCHIVE_FORMATS.items():
+        paths = sorted(str(path) for path in archive_dir.glob(f'{PARTITION_COLUMN}=*/*{suffix}'))
+        if paths:
+            datasets.append(ds.dataset(
+                paths,
+                schema=schema,
+                format='parquet' if archive_format == 'parquet' else 'ipc',
+                partitioning=partitioning,
+                partition_base_dir=str(archive_dir),
+                filesystem=filesystem
+            ))
+    if not datasets:
+        return None
+    return datasets[0] if len(datasets) == 1 else ds.dataset(datasets)
+
+
+def query_archive(archive_dir, columns=None, start=None, end=None, filter=None):
+    """Read archived rows as an Arrow table, projecting `columns` and pruning by created_at range"""
+    import pyarrow.dataset as ds
+
+    dataset = open_archive(archive_dir)
+    if dataset is None:
+        return archive_schema().empty_table().select(list(columns or ARCHIVE_COLUMNS))
+
+    expression = filter
+    for bound, month_op, time_op in ((start, '__ge__', '__ge__'), (end, '__le__', '__lt__')):
+        if bound is None:
+            continue
+        # The partition test lets whole months be skipped without opening their files
+        condition = (
+            getattr(ds.field(PARTITION_COLUMN), month_op)(bound.strftime('%Y-%m'))
+            & getattr(ds.field('created_at'), time_op)(bound)
+        )
+        expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expression)
+
+
+def archived_hourly_counts(archive_dir):
+    """{(hour_start, risk_level): rows} over the whole archive, for rebuilding the rollup"""
+    import pyarrow.compute as pc
+
+    table = query_archive(archive_dir, columns=['created_at', 'risk_level'])
+    if table.num_rows == 0:
+        return {}
+    table = table.append_column('hour', pc.floor_temporal(table['created_at'], unit='hour'))
+    counts = table.group_by(['hour', 'risk_level']).aggregate([('created_at', 'count')])
+    return {
+        (hour, risk_level): count
+        for hour, risk_level, count in zip(
+            counts['hour'].to_pylist(), counts['risk_level'].to_pylist(), counts['created_at_count'].to_pylist()
+        )
+    }
@@ -0,0 +1,354 @@
+"""
+ASGI entry point for high-concurrency clients
+
+Serves /predict, /history, /stats, /export, /features and /health from an
+event loop, so thousands of slow or idle connections do not each hold a
+worker thread. Configuration, model loading and validation, the request
+schema, caches and the response/paging/export helpers are the ones the WSGI
+app uses; only the transport differs.
+
+Database work goes through SQLAlchemy's asyncio engines (asyncpg for Postgres,
+aiosqlite for SQLite). Each query runs the same ORM helpers as the WSGI views
+via AsyncSession.run_sync, so a request waiting on the database yields the
+loop instead of blocking it. Scoring is a few microseconds and runs inline by
+default; ASGI_INFERENCE_WORKERS > 0 moves it to a bounded thread pool for
+slower engines such as sklearn.
+
+Admin endpoints, /predict/batch, /metrics, shadow/A-B scoring and the
+write-behind queue remain WSGI-only.
+
+    uvicorn --factory asgi:create_asgi_app --app-dir app --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import contextlib
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+from flask import Config
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from app import (
+    STREAM_EXPORT_FORMATS, ExportEncoder, build_prediction_response, export_headers, export_payload,
+    export_query, find_user, history_payload, load_config, parse_page_args, score_features
+)
+from database import PoolMonitor, async_database_url, build_async_engine_options
+from json_provider import dumps, loads
+from log_setup import configure_logging
+from metrics import StageTimer
+from model_registry import ModelRegistry
+from models import db, Prediction
+from prediction_cache import PredictionCache
+from schema import FEATURE_INFO, FEATURE_NAMES, RECORD_SCHEMA, format_errors
+from users import UserIdCache
+from write_behind import write_predictions
+import stats_rollup
+
+logger = logging.getLogger(__name__)
+
+
+class JSONResponse(Response):
+    """JSON response encoded like the WSGI app's"""
+
+    media_type = 'application/json'
+
+    def render(self, content):
+        return dumps(content) + b'\n'
+
+
+def error_response(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+async def run_db(sessionmaker, fn, *args):
+    """Run a sync ORM helper, called as fn(session, *args), on a pooled async connection"""
+    async with sessionmaker() as session:
+        return await session.run_sync(fn, *args)
+
+
+def persist_prediction(session, session_id, row, user_cache):
+    write_predictions(session, [(session_id, row)], user_cache)
+    session.commit()
+
+
+def load_history(session, session_id, limit, after):
+    user = find_user(session, session_id)
+    return history_payload(session, user, limit, after) if user else None
+
+
+def load_export(session, session_id, limit, after):
+    user = find_user(session, session_id)
+    return export_payload(session, user, limit, after) if user else None
+
+
+def load_summary(session):
+    return stats_rollup.summarize(session=session)
+
+
+def load_timeseries(session, hours):
+    return stats_rollup.timeseries(hours, session=session)
+
+
+def find_user_id(session, session_id):
+    user = find_user(session, session_id)
+    return user.id if user else None
+
+
+async def health(request):
+    """Health check endpoint"""
+    state = request.app.state
+    loaded_model = state.model_registry.current
+    return JSONResponse({
+        'status': 'healthy',
+        'server': 'asgi',
+        'model_loaded': loaded_model is not None,
+        'scaler_loaded': loaded_model is not None,
+        'inference_engine': loaded_model.inference_engine if loaded_model is not None else None,
+        'inference_workers': state.config['ASGI_INFERENCE_WORKERS'],
+        'model_version': loaded_model.version if loaded_model is not None else None,
+        'model_registry': state.model_registry.stats(),
+        'db_pool': state.pool_monitor.stats(),
+        'prediction_cache': state.prediction_cache.stats() if state.prediction_cache is not None else None,
+        'user_cache': state.user_cache.stats() if state.user_cache is not None else None
+    })
+
+
+async def features(request):
+    """Get feature information for the frontend"""
+    return JSONResponse({
+        'features': FEATURE_INFO,
+        'feature_order': FEATURE_NAMES
+    })
+
+
+async def predict(request):
+    """Predict heart disease risk"""
+    state = request.app.state
+    try:
+        loaded_model = state.model_registry.current
+        if loaded_model is None:
+            return error_response('Model or scaler not loaded properly', 500)
+
+        try:
+            data = loads(await request.body())
+        except ValueError:
+            return error_response('Request body is not valid JSON', 400)
+        if not data:
+            return error_response('No data provided', 400)
+
+        features, errors = RECORD_SCHEMA.validate(data)
+        if errors:
+            return JSONResponse({'error': format_errors(errors), 'details': errors}, status_code=400)
+
+        session_id = request.headers.get('x-session-id') or str(uuid.uuid4())
+        prediction_id = str(uuid.uuid4())
+
+        score = partial(score_features, loaded_model, state.prediction_cache, features, StageTimer())
+        if state.inference_executor is not None:
+            prediction, prediction_proba = await asyncio.get_running_loop().run_in_executor(
+                state.inference_executor, score
+            )
+        else:
+            prediction, prediction_proba = score()
+
+        response_data = build_prediction_response(prediction, prediction_proba)
+        response_data['model_version'] = loaded_model.version
+
+        try:
+            request_info = {
+                'ip_address': request.headers.get('x-forwarded-for', request.client.host if request.client else None),
+                'user_agent': request.headers.get('user-agent', '')
+            }
+            row = Prediction.row_from_request(None, features, response_data, request_info, prediction_id)
+            await run_db(state.sessionmaker, persist_prediction, session_id, row, state.user_cache)
+            response_data['prediction_id'] = prediction_id
+            response_data['session_id'] = session_id
+        except Exception as e:
+            logger.error("Database error (continuing without saving): %s", e)
+
+        return JSONResponse(response_data)
+    except Exception as e:
+        return error_response(f'Prediction failed: {str(e)}', 500)
+
+
+async def history(request):
+    """Get prediction history for a user"""
+    state = request.app.state
+    try:
+        try:
+            limit, after = parse_page_args(
+                request.query_params, state.config['HISTORY_PAGE_SIZE'], state.config['MAX_PAGE_SIZE']
+            )
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        payload = await run_db(
+            state.read_sessionmaker, load_history, request.path_params['session_id'], limit, after
+        )
+        if payload is None:
+            return error_response('User not found', 404)
+        return JSONResponse(payload)
+    except Exception as e:
+        return error_response(f'Failed to retrieve history: {str(e)}', 500)
+
+
+async def stats(request):
+    """Get application statistics"""
+    try:
+        return JSONResponse(await run_db(request.app.state.read_sessionmaker, load_summary))
+    except Exception as e:
+        return error_response(f'Failed to retrieve stats: {str(e)}', 500)
+
+
+async def stats_timeseries(request):
+    """Get hourly prediction volume and risk mix"""
+    state = request.app.state
+    try:
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return error_response(f"Invalid hours: {request.query_params.get('hours')}", 400)
+        if not 1 <= hours <= state.config['STATS_MAX_HOURS']:
+            return error_response(f"hours must be between 1 and {state.config['STATS_MAX_HOURS']}", 400)
+
+        buckets = await run_db(state.read_sessionmaker, load_timeseries, hours)
+        return JSONResponse({'hours': hours, 'buckets': buckets})
+    except Exception as e:
+        return error_response(f'Failed to retrieve stats: {str(e)}', 500)
+
+
+async def export(request):
+    """Export user data in JSON format, or stream it as NDJSON/CSV"""
+    state = request.app.state
+    session_id = request.path_params['session_id']
+    try:
+        export_format = request.query_params.get('format', 'json')
+        if export_format != 'json' and export_format not in STREAM_EXPORT_FORMATS:
+            return error_response(f'Unsupported export format: {export_format}', 400)
+
+        try:
+            limit, after = parse_page_args(
+                request.query_params, state.config['EXPORT_PAGE_SIZE'], state.config['MAX_PAGE_SIZE']
+            )
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        if export_format == 'json':
+            payload = await run_db(state.read_sessionmaker, load_export, session_id, limit, after)
+            if payload is None:
+                return error_response('User not found', 404)
+            return JSONResponse(payload)
+
+        user_id = await run_db(state.read_sessionmaker, find_user_id, session_id)
+        if user_id is None:
+            return error_response('User not found', 404)
+
+        compress = request.query_params.get('gzip', 'false').lower() == 'true'
+        mimetype, headers = export_headers(session_id, export_format, compress)
+        chunks = stream_predictions(state, user_id, export_format, compress)
+        return StreamingResponse(chunks, media_type=mimetype, headers=headers)
+    except Exception as e:
+        return error_response(f'Failed to export data: {str(e)}', 500)
+
+
+async def stream_predictions(state, user_id, export_format, compress):
+    """Async counterpart of app.stream_predictions, reading through a server-side cursor"""
+    chunk_size = state.config['EXPORT_STREAM_CHUNK']
+    encoder = ExportEncoder(export_format, compress, lambda obj: dumps(obj).decode())
+    async with state.read_sessionmaker() as session:
+        rows = await session.stream_scalars(export_query(user_id).execution_options(yield_per=chunk_size))
+        async for partition in rows.partitions():
+            for prediction in partition:
+                encoder.write(prediction)
+            chunk = encoder.flush()
+            if chunk:
+                yield chunk
+    chunk = encoder.close()
+    if chunk:
+        yield chunk
+
+
+routes = [
+    Route('/health', health, methods=['GET']),
+    Route('/features', features, methods=['GET']),
+    Route('/predict', predict, methods=['POST']),
+    Route('/history/{session_id}', history, methods=['GET']),
+    Route('/stats', stats, methods=['GET']),
+    Route('/stats/timeseries', stats_timeseries, methods=['GET']),
+    Route('/export/{session_id}', export, methods=['GET'])
+]
+
+
+def create_async_engines(config):
+    """(primary, replica) async engines; replica is the primary when no DATABASE_REPLICA_URL is set"""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    primary = create_async_engine(async_database_url(url), **build_async_engine_options(url, config))
+    replica = primary
+    if config['DATABASE_REPLICA_URL']:
+        replica_url = config['DATABASE_REPLICA_URL']
+        replica = create_async_engine(
+            async_database_url(replica_url), **build_async_engine_options(replica_url, config)
+        )
+    return primary, replica
+
+
+def create_asgi_app(config=None):
+    """ASGI application factory: the WSGI app's configuration and model, served with async I/O"""
+    configure_logging()
+    # load_config and the from_config constructors only need an object with a Flask-style config
+    holder = SimpleNamespace(config=Config(None))
+    load_config(holder)
+    if config:
+        holder.config.update(config)
+    config = holder.config
+
+    model_registry = ModelRegistry.from_config(holder, FEATURE_NAMES, FEATURE_INFO)
+    model_registry.load_initial()
+
+    primary, replica = create_async_engines(config)
+    engines = {None: primary.sync_engine}
+    if replica is not primary:
+        engines['replica'] = replica.sync_engine
+    workers = config['ASGI_INFERENCE_WORKERS']
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if config['CREATE_TABLES_ON_STARTUP']:
+            try:
+                async with primary.begin() as connection:
+                    await connection.run_sync(db.metadata.create_all)
+                logger.info("Database tables created successfully")
+            except Exception as e:
+                logger.error("Error creating database tables: %s", e)
+        try:
+            yield
+        finally:
+            if app.state.inference_executor is not None:
+                app.state.inference_executor.shutdown(wait=False)
+            await primary.dispose()
+            if replica is not primary:
+                await replica.dispose()
+
+    app = Starlette(
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=['http://localhost:3000', 'http://127.0.0.1:3000'],
+                               allow_methods=['*'], allow_headers=['*'])],
+        lifespan=lifespan
+    )
+    app.state.config = config
+    app.state.model_registry = model_registry
+    app.state.prediction_cache = PredictionCache.from_config(holder) if config['PREDICTION_CACHE_SIZE'] > 0 else None
+    app.state.user_cache = UserIdCache.from_config(holder) if config['USER_CACHE_SIZE'] > 0 else None
+    app.state.sessionmaker = async_sessionmaker(primary, expire_on_commit=False)
+    app.state.read_sessionmaker = async_sessionmaker(replica, expire_on_commit=False)
+    app.state.pool_monitor = PoolMonitor(engines)
+    app.state.inference_executor = (
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference') if workers > 0 else None
+    )
+    return app
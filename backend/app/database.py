@@ -0,0 +1,126 @@
+"""
+Engine options, read-replica routing and connection pool monitoring
+
+Read-only endpoints are marked with @read_only. While one of them runs, the
+session sends queries to the 'replica' bind when DATABASE_REPLICA_URL is set;
+everything else, and any flush, goes to the primary.
+
+The ASGI entry point connects to the same databases through asyncio drivers;
+async_database_url and build_async_engine_options translate the settings.
+"""
+
+import threading
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+# Backend -> asyncio driver used by the ASGI app
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def build_engine_options(database_url, config):
+    """SQLAlchemy create_engine options from DB_* settings in the app config"""
+    options = {
+        # Test connections on checkout so a restarted Postgres does not fail the next request
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+    if database_url.startswith('sqlite'):
+        # SQLite pools are per-file and not sized like a server pool
+        return options
+
+    options.update(
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        pool_use_lifo=True  # Idle connections beyond the working set age out via pool_recycle
+    )
+    if database_url.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+def async_database_url(database_url):
+    """The same database URL with its backend's asyncio driver; raises ValueError if there is none"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver configured for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def build_async_engine_options(database_url, config):
+    """create_async_engine options from DB_* settings; the pool is sized per event loop like per worker"""
+    options = build_engine_options(database_url, config)
+    if 'connect_args' in options:
+        # asyncpg takes server settings directly instead of libpq's options string
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+        }
+    return options
+
+
+def read_only(view):
+    """Route a view's queries to the read replica, if one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from the replica inside @read_only views"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get('use_replica')
+            and REPLICA_BIND in self._db.engines
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class PoolMonitor:
+    """Pool status and connection event counters for every engine of the app"""
+
+    def __init__(self, engines):
+        self.engines = {('primary' if key is None else key): engine for key, engine in engines.items()}
+        self._counters = {name: {'connects': 0, 'checkouts': 0, 'invalidations': 0} for name in self.engines}
+        self._lock = threading.Lock()
+        for name, engine in self.engines.items():
+            for event_name, counter in (('connect', 'connects'), ('checkout', 'checkouts'),
+                                        ('invalidate', 'invalidations')):
+                event.listen(engine.pool, event_name, self._counting(name, counter))
+
+    def stats(self):
+        """Per-engine pool status for health and metrics endpoints"""
+        stats = {}
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            entry = {'pool_class': type(pool).__name__}
+            for stat in ('size', 'checkedin', 'checkedout', 'overflow'):
+                # Not every pool class (e.g. SQLite's) implements all of these
+                if hasattr(pool, stat):
+                    entry[stat] = getattr(pool, stat)()
+            max_overflow = getattr(pool, '_max_overflow', None)
+            if 'size' in entry and 'checkedout' in entry and max_overflow is not None and max_overflow >= 0:
+                capacity = entry['size'] + max_overflow
+                entry['utilization'] = round(entry['checkedout'] / capacity, 4) if capacity else None
+            with self._lock:
+                entry.update(self._counters[name])
+            stats[name] = entry
+        return stats
+
+    def _counting(self, name, counter):
+        def listener(*args):
+            with self._lock:
+                self._counters[name][counter] += 1
+        return listener
@@ -0,0 +1,248 @@
+"""
+Closed-form inference for the served StandardScaler + logistic model pair
+
+Both LogisticRegression and an SGDClassifier trained with log loss (the
+incremental trainer) are logistic models and fold the same way.
+
+LookupLogisticModel goes one step further for this feature space: the
+categorical features only take a few thousand combinations, so their part of
+the score is precomputed into a table and a request costs one table index plus
+a multiply-add per continuous feature (or, in approximate mode, a lookup of its
+quantized contribution).
+"""
+
+import itertools
+import math
+import operator
+import numpy as np
+
+# Maximum absolute probability difference tolerated between the folded model and sklearn
+PARITY_TOLERANCE = 1e-9
+
+
+def is_logistic_model(model):
+    """True for models whose positive-class probability is sigmoid(coef . x + intercept)"""
+    model_type = type(model).__name__
+    if model_type == 'LogisticRegression':
+        return True
+    return model_type == 'SGDClassifier' and getattr(model, 'loss', None) in ('log_loss', 'log')
+
+
+def _sigmoid(decision):
+    if decision >= 0:
+        return 1.0 / (1.0 + math.exp(-decision))
+    exp_decision = math.exp(decision)
+    return exp_decision / (1.0 + exp_decision)
+
+
+class FoldedLogisticModel:
+    """Logistic regression with the scaler folded into a single weight vector and bias"""
+
+    engine = 'closed_form'
+    tolerance = PARITY_TOLERANCE
+
+    def __init__(self, weights, bias, classes):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.classes_ = np.asarray(classes)
+        # Plain Python copies for the single-record path, which avoids numpy call overhead
+        self._weights_list = self.weights.tolist()
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        """Fold scaler mean/scale into the model coefficients, or return None if not foldable"""
+        coef = getattr(model, 'coef_', None)
+        intercept = getattr(model, 'intercept_', None)
+        classes = getattr(model, 'classes_', None)
+        if coef is None or intercept is None or classes is None:
+            return None
+        if not is_logistic_model(model) or len(classes) != 2:
+            return None
+        if type(scaler).__name__ != 'StandardScaler':
+            return None
+
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+        n_features = coef.shape[0]
+
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) and scaler.scale_ is not None else np.ones(n_features)
+        return cls.from_params(mean, scale, coef, intercept, classes)
+
+    @classmethod
+    def from_params(cls, mean, scale, coef, intercept, classes):
+        """Fold raw scaler and logistic regression parameters"""
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+
+        # w . ((x - mean) / scale) + b  ==  (w / scale) . x + (b - w . (mean / scale))
+        weights = coef / scale
+        bias = float(np.asarray(intercept).ravel()[0]) - float(np.dot(coef, mean / scale))
+        return cls(weights, bias, classes)
+
+    def predict_proba(self, features_array):
+        """Class probabilities for a 2D feature matrix"""
+        decision = np.asarray(features_array, dtype=np.float64) @ self.weights + self.bias
+        positive = 1.0 / (1.0 + np.exp(-decision))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict_one(self, features):
+        """Positive-class probability for a single record given as a list of floats"""
+        decision = self.bias
+        for weight, value in zip(self._weights_list, features):
+            decision += weight * value
+        return _sigmoid(decision)
+
+
+class LookupLogisticModel:
+    """A folded logistic model whose categorical contribution is read from a precomputed table
+
+    `domain` describes each feature in order, either as ('options', [values]) or
+    ('range', min, max). Records with a categorical value outside its options
+    are scored by the folded model instead; in approximate mode, continuous
+    values outside their range fall back to an exact multiply-add.
+    """
+
+    def __init__(self, folded, domain, approximate=False, quant_steps=1024):
+        if quant_steps < 2:
+            raise ValueError(f'quant_steps must be at least 2, got {quant_steps}')
+        self.folded = folded
+        self.classes_ = folded.classes_
+        self.approximate = approximate
+        self.quant_steps = quant_steps
+        self.engine = 'lookup_approximate' if approximate else 'lookup'
+        weights = folded.weights
+
+        self.categorical_columns = [column for column, spec in enumerate(domain) if spec[0] == 'options']
+        self.continuous_columns = [column for column, spec in enumerate(domain) if spec[0] == 'range']
+        self.levels = [np.array(sorted(float(value) for value in domain[column][1]))
+                       for column in self.categorical_columns]
+
+        # Row-major table over the categorical features, with the bias folded in
+        table = np.array([folded.bias])
+        for column, levels in zip(self.categorical_columns, self.levels):
+            table = (table[:, None] + weights[column] * levels[None, :]).ravel()
+        self.table = table
+        self.strides = np.cumprod([1] + [len(levels) for levels in self.levels[:0:-1]])[::-1]
+        # The single-record path finds its entry with one dict lookup on the tuple of categorical values
+        combinations = itertools.product(*(levels.tolist() for levels in self.levels))
+        self._table_by_key = dict(zip(combinations, table.tolist()))
+        self._categorical_key = operator.itemgetter(*self.categorical_columns)
+        self._continuous_values = operator.itemgetter(*self.continuous_columns)
+
+        self.continuous_weights = weights[self.continuous_columns]
+        self._continuous_weights_list = self.continuous_weights.tolist()
+        self.lows = np.array([float(domain[column][1]) for column in self.continuous_columns])
+        self.steps = np.array([float(domain[column][2]) - float(domain[column][1])
+                               for column in self.continuous_columns]) / (quant_steps - 1)
+        # Contribution of each continuous feature at each grid point, so approximate scoring is a lookup
+        grid_points = self.lows[:, None] + self.steps[:, None] * np.arange(quant_steps)
+        self.contributions = self.continuous_weights[:, None] * grid_points
+        self._quantized = list(zip(
+            self._continuous_weights_list, self.lows.tolist(), (1.0 / self.steps).tolist(), self.contributions.tolist()
+        ))
+
+        self.decision_error_bound = float(np.sum(np.abs(self.continuous_weights) * self.steps) / 2)
+        # The sigmoid's slope is at most 1/4, which bounds the probability error of quantizing
+        self.tolerance = (self.decision_error_bound / 4 if approximate else 0.0) + PARITY_TOLERANCE
+
+    @classmethod
+    def from_feature_info(cls, folded, feature_info, feature_names, approximate=False, quant_steps=1024):
+        """Build the table from FEATURE_INFO-style metadata ('options' or 'min'/'max' per feature)"""
+        domain = []
+        for name in feature_names:
+            info = feature_info[name]
+            if 'options' in info:
+                domain.append(('options', list(info['options'])))
+            else:
+                domain.append(('range', info['min'], info['max']))
+        return cls(folded, domain, approximate, quant_steps)
+
+    def predict_proba(self, features_array):
+        """Class probabilities for a 2D feature matrix"""
+        if not self.approximate:
+            # Exact table scores equal the folded model's, which scores a matrix in a single matmul
+            return self.folded.predict_proba(features_array)
+
+        features_array = np.asarray(features_array, dtype=np.float64)
+        index = np.zeros(features_array.shape[0], dtype=np.int64)
+        known = np.ones(features_array.shape[0], dtype=bool)
+        for column, levels, stride in zip(self.categorical_columns, self.levels, self.strides):
+            values = features_array[:, column]
+            codes = np.clip(np.searchsorted(levels, values), 0, len(levels) - 1)
+            known &= levels[codes] == values
+            index += codes * stride
+
+        values = features_array[:, self.continuous_columns]
+        steps = np.rint((values - self.lows) / self.steps)
+        on_grid = (steps >= 0) & (steps < self.quant_steps)
+        rows = np.arange(len(self.continuous_columns))
+        quantized = self.contributions[rows, np.clip(steps, 0, self.quant_steps - 1).astype(np.int64)]
+        decision = self.table[index] + np.where(on_grid, quantized, values * self.continuous_weights).sum(axis=1)
+
+        if not known.all():
+            unknown = ~known
+            decision[unknown] = features_array[unknown] @ self.folded.weights + self.folded.bias
+        positive = 1.0 / (1.0 + np.exp(-decision))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict_one(self, features):
+        """Positive-class probability for a single record given as a list of floats"""
+        decision = self._table_by_key.get(self._categorical_key(features))
+        if decision is None:
+            return self.folded.predict_one(features)
+
+        if self.approximate:
+            continuous = zip(self._quantized, self._continuous_values(features))
+            for (weight, low, inverse_step, contributions), value in continuous:
+                step = round((value - low) * inverse_step)
+                decision += contributions[step] if 0 <= step < len(contributions) else weight * value
+        else:
+            for weight, value in zip(self._continuous_weights_list, self._continuous_values(features)):
+                decision += weight * value
+        return _sigmoid(decision)
+
+    def grid(self):
+        """Every categorical combination, with continuous features at the middle of their range"""
+        combinations = np.array(np.meshgrid(*self.levels, indexing='ij')).reshape(len(self.levels), -1).T
+        rows = np.empty((combinations.shape[0], len(self.folded.weights)))
+        rows[:, self.categorical_columns] = combinations
+        rows[:, self.continuous_columns] = self.lows + self.steps * (self.quant_steps - 1) / 2
+        return rows
+
+    def stats(self):
+        """Table sizes and the approximation bound, for health and parity endpoints"""
+        return {
+            'engine': self.engine,
+            'table_entries': int(self.table.size),
+            'categorical_features': len(self.categorical_columns),
+            'continuous_features': len(self.continuous_columns),
+            'quant_steps': self.quant_steps if self.approximate else None,
+            'max_decision_error': self.decision_error_bound if self.approximate else 0.0,
+            'tolerance': self.tolerance
+        }
+
+
+def check_parity(fast_model, model, scaler, features_array, tolerance=PARITY_TOLERANCE):
+    """Compare folded-model probabilities with the sklearn pipeline on a feature matrix"""
+    expected = model.predict_proba(scaler.transform(features_array))[:, 1]
+    return _compare(fast_model, expected, features_array, tolerance)
+
+
+def check_against(fast_model, reference_model, features_array, tolerance=PARITY_TOLERANCE):
+    """Compare a fast model with another one, e.g. a lookup table with the folded model it was built from"""
+    expected = reference_model.predict_proba(features_array)[:, 1]
+    return _compare(fast_model, expected, features_array, tolerance)
+
+
+def _compare(fast_model, expected, features_array, tolerance):
+    matrix_proba = fast_model.predict_proba(features_array)[:, 1]
+    single_proba = np.array([fast_model.predict_one(row) for row in features_array.tolist()])
+
+    max_diff = float(max(np.abs(matrix_proba - expected).max(), np.abs(single_proba - expected).max()))
+    return {
+        'rows': int(features_array.shape[0]),
+        'max_abs_diff': max_diff,
+        'tolerance': tolerance,
+        'passed': max_diff <= tolerance
+    }
@@ -0,0 +1,72 @@
+"""
+Fast JSON encoding for API responses
+
+When orjson is installed, OrjsonProvider replaces Flask's JSON provider, so
+jsonify() and request.get_json() encode and decode through it. Output matches
+Flask's default provider (sorted keys, HTTP dates, pretty-printed in debug);
+numpy values are serialized natively. Without orjson, Flask's stdlib-based
+provider is kept. dumps() and loads() give the ASGI app the same encoding
+outside of Flask.
+"""
+
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _base_options():
+    return orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def _options(self, indent=False):
+        options = _base_options()
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('cls') is not None:
+            # A custom encoder class only works with the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options(bool(kwargs.get('indent')))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Encoded straight to bytes, skipping the str round trip of the default provider
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Use orjson for the app's JSON if it is installed; returns the provider's name"""
+    if orjson is None:
+        return 'json'
+    app.json = OrjsonProvider(app)
+    return 'orjson'
+
+
+def dumps(obj):
+    """Compact JSON bytes with sorted keys, encoded like the Flask provider in production"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=_base_options() | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, default=DefaultJSONProvider.default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """Decode JSON text or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
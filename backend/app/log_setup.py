@@ -0,0 +1,65 @@
+"""
+Leveled, buffered logging for the prediction service
+
+Request threads only put records on an in-memory queue; a listener thread
+formats them and does the stream I/O, so logging never blocks a request on
+stdout/stderr.
+"""
+
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'
+
+
+class BufferedQueueHandler(QueueHandler):
+    """QueueHandler that (re)starts its listener thread in every process that logs"""
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, record):
+        # Threads do not survive fork, so each worker process starts its own listener
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def flush(self):
+        """Drain queued records; logging.shutdown() calls this at exit"""
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                self._listener = None
+                self._pid = None
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+
+def configure_logging(level=None):
+    """Route the root logger through a buffered queue handler; safe to call more than once"""
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    root = logging.getLogger()
+    root.setLevel(level)
+    if any(isinstance(handler, BufferedQueueHandler) for handler in root.handlers):
+        return root
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = BufferedQueueHandler(stream_handler)
+    root.addHandler(handler)
+    return root
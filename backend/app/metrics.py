@@ -0,0 +1,350 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Counters and histograms are kept per worker process; gauges for queues,
+caches and the DB pool are read from their components at scrape time.
+
+With a multiprocess directory (METRICS_MULTIPROC_DIR, set up by
+gunicorn.conf.py), every worker writes a snapshot of its metrics there every
+METRICS_FLUSH_INTERVAL seconds and when it is scraped, and /metrics answers
+with all workers merged: counters and histograms are summed, and component
+gauges get a `pid` label. gunicorn's child_exit hook folds the snapshot of an
+exited worker into an archive file, so totals never go backwards when workers
+are recycled.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = 'archived.json'
+
+# Upper bounds in seconds; the low end resolves single-record inference (tens of microseconds)
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        """[[labelvalues, value], ...] for a snapshot"""
+        with self._lock:
+            return [[list(labelvalues), value] for labelvalues, value in self._values.items()]
+
+    def render(self, values=None):
+        """Exposition lines for this counter's own values, or for merged {labelvalues: value}"""
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        """[[labelvalues, bucket counts, sum, count], ...] for a snapshot"""
+        with self._lock:
+            return [
+                [list(labelvalues), list(counts), total, count]
+                for labelvalues, (counts, total, count) in self._values.items()
+            ]
+
+    def render(self, values=None):
+        """Exposition lines for this histogram's own values, or for merged {labelvalues: [counts, sum, count]}"""
+        if values is None:
+            with self._lock:
+                values = {labelvalues: (list(counts), total, count)
+                          for labelvalues, (counts, total, count) in self._values.items()}
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        bucket_labels = self.labelnames + ('le',)
+        for labelvalues, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labels, labelvalues + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class StageTimer:
+    """Accumulates wall time per named stage of one request"""
+
+    def __init__(self):
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def observe(self, histogram):
+        for name, duration in self.durations.items():
+            histogram.observe(duration, name)
+
+
+class Metrics:
+    """Request metrics for the app plus gauges collected from other components"""
+
+    def __init__(self, multiprocess_dir=None, flush_interval=5.0):
+        self.requests = Counter(
+            'heart_http_requests_total', 'HTTP requests by route, method and status code',
+            ('route', 'method', 'status')
+        )
+        self.request_duration = Histogram(
+            'heart_http_request_duration_seconds', 'HTTP request latency by route',
+            ('route', 'method')
+        )
+        self.predict_stages = Histogram(
+            'heart_predict_stage_duration_seconds', 'Time spent in each stage of /predict',
+            ('stage',)
+        )
+        self._counters = (self.requests,)
+        self._histograms = (self.request_duration, self.predict_stages)
+        self._collectors = []
+
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+        self.flush_interval = flush_interval
+        self._flusher = None
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+        self._app = None
+
+    @classmethod
+    def from_config(cls, app):
+        """Build metrics from METRICS_* settings in the app config"""
+        return cls(app.config['METRICS_MULTIPROC_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+
+    def init_app(self, app):
+        self._app = app
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def add_collector(self, collector):
+        """Register a callable returning [(name, type, help, [(labels dict, value), ...]), ...]"""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """This process's metrics as JSON-serializable data"""
+        return {
+            'pid': os.getpid(),
+            'counters': {counter.name: counter.samples() for counter in self._counters},
+            'histograms': {histogram.name: histogram.samples() for histogram in self._histograms},
+            'collected': [
+                [name, metric_type, documentation, [[dict(labels), value] for labels, value in samples]]
+                for collector in self._collectors
+                for name, metric_type, documentation, samples in collector()
+            ]
+        }
+
+    def write_snapshot(self):
+        """Publish this worker's snapshot to the multiprocess directory"""
+        _write_json(self.multiprocess_dir / f'worker-{os.getpid()}.json', self.snapshot())
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format, merged across workers if configured"""
+        if self.multiprocess_dir is None:
+            return self._render(self.snapshot())
+
+        self.write_snapshot()
+        snapshots = [_read_json(self.multiprocess_dir / ARCHIVE_FILE)]
+        snapshots += [_read_json(path) for path in sorted(self.multiprocess_dir.glob('worker-*.json'))]
+        return self._render(merge_snapshots([snapshot for snapshot in snapshots if snapshot]))
+
+    def _render(self, snapshot):
+        lines = []
+        for counter in self._counters:
+            lines += counter.render({
+                tuple(labelvalues): value for labelvalues, value in snapshot['counters'].get(counter.name, [])
+            })
+        for histogram in self._histograms:
+            lines += histogram.render({
+                tuple(labelvalues): (counts, total, count)
+                for labelvalues, counts, total, count in snapshot['histograms'].get(histogram.name, [])
+            })
+        for name, metric_type, documentation, samples in snapshot['collected']:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f'{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _ensure_flusher(self):
+        # Threads do not survive fork, so each worker process starts its own flusher
+        if self.multiprocess_dir is None or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+            # The last counts of a worker that exits cleanly are kept as well
+            atexit.register(self._flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush()
+
+    def _flush(self):
+        # Component collectors read from the app, so they need its context outside requests
+        try:
+            with self._app.app_context():
+                self.write_snapshot()
+        except Exception as e:
+            logger.warning("Writing metrics snapshot failed: %s", e)
+
+    def _before_request(self):
+        self._ensure_flusher()
+        g.metrics_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        # The URL rule, not the path, keeps per-session URLs from creating new series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        self.requests.inc(route, request.method, str(response.status_code))
+        if started is not None:
+            self.request_duration.observe(time.perf_counter() - started, route, request.method)
+        return response
+
+
+def merge_snapshots(snapshots, keep_gauges=True):
+    """Sum counters and histograms of several snapshots; gauges are kept per process with a pid label"""
+    counters = {}
+    histograms = {}
+    collected = {}  # name -> [type, help, {label pairs: value}]
+    for snapshot in snapshots:
+        for name, samples in snapshot['counters'].items():
+            merged = counters.setdefault(name, {})
+            for labelvalues, value in samples:
+                key = tuple(labelvalues)
+                merged[key] = merged.get(key, 0) + value
+        for name, samples in snapshot['histograms'].items():
+            merged = histograms.setdefault(name, {})
+            for labelvalues, counts, total, count in samples:
+                key = tuple(labelvalues)
+                if key in merged:
+                    entry = merged[key]
+                    merged[key] = ([a + b for a, b in zip(entry[0], counts)], entry[1] + total, entry[2] + count)
+                else:
+                    merged[key] = (list(counts), total, count)
+        for name, metric_type, documentation, samples in snapshot['collected']:
+            if metric_type == 'gauge' and (not keep_gauges or snapshot.get('pid') is None):
+                continue
+            merged = collected.setdefault(name, [metric_type, documentation, {}])[2]
+            for labels, value in samples:
+                if value is None:
+                    continue
+                if metric_type == 'gauge':
+                    labels = dict(labels, pid=str(snapshot['pid']))
+                key = tuple(labels.items())
+                merged[key] = merged.get(key, 0) + value
+
+    return {
+        'pid': None,
+        'counters': {name: [[list(key), value] for key, value in values.items()] for name, values in counters.items()},
+        'histograms': {
+            name: [[list(key), counts, total, count] for key, (counts, total, count) in values.items()]
+            for name, values in histograms.items()
+        },
+        'collected': [
+            [name, metric_type, documentation, [[dict(key), value] for key, value in samples.items()]]
+            for name, (metric_type, documentation, samples) in collected.items()
+        ]
+    }
+
+
+def mark_process_dead(multiprocess_dir, pid):
+    """Fold an exited worker's counters into the archive file and drop its snapshot"""
+    multiprocess_dir = Path(multiprocess_dir)
+    path = multiprocess_dir / f'worker-{pid}.json'
+    snapshot = _read_json(path)
+    if snapshot is None:
+        return
+    archive_path = multiprocess_dir / ARCHIVE_FILE
+    archive = _read_json(archive_path)
+    _write_json(archive_path, merge_snapshots([s for s in (archive, snapshot) if s], keep_gauges=False))
+    path.unlink()
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    # Readers must never see a half-written snapshot
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
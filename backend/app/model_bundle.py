@@ -0,0 +1,120 @@
+"""
+Versioned single-file model bundle
+
+Layout (little-endian):
+    8 bytes   magic b'HDBUNDL1'
+    4 bytes   header length (uint32)
+    header    UTF-8 JSON: version, feature order, classes, array offsets, sha256
+    data      float64 arrays, 8-byte aligned so the file can be memory-mapped
+
+The bundle holds raw StandardScaler and logistic model parameters
+(LogisticRegression, or SGDClassifier with log loss), so serving needs neither
+sklearn nor unpickling. The header records the sha256 of the pickles it was
+built from, so a bundle left behind by newer pickles can be detected.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from inference import FoldedLogisticModel, check_parity
+
+BUNDLE_FILE = "model_bundle.bin"
+MAGIC = b'HDBUNDL1'
+FORMAT_VERSION = 1
+ARRAY_NAMES = ('scaler_mean', 'scaler_scale', 'coef', 'intercept')
+
+
+class BundleError(ValueError):
+    """Raised when a bundle cannot be written or fails validation"""
+
+
+def write_bundle(path, model, scaler, feature_names, version=None, check_data=None, pickle_sha256=None):
+    """Write a logistic model + StandardScaler pair as a bundle; returns the header"""
+    fast_model = FoldedLogisticModel.from_sklearn(model, scaler)
+    if fast_model is None:
+        raise BundleError(f'Only StandardScaler + binary logistic models can be bundled, got {type(model).__name__}')
+
+    feature_names = list(feature_names)
+    n_features = len(feature_names)
+    arrays = {
+        'scaler_mean': scaler.mean_ if scaler.with_mean else np.zeros(n_features),
+        'scaler_scale': scaler.scale_ if scaler.with_std else np.ones(n_features),
+        'coef': np.asarray(model.coef_).ravel(),
+        'intercept': np.asarray(model.intercept_).ravel()
+    }
+
+    # The bundle must reproduce sklearn before it is allowed to replace it
+    if check_data is None:
+        check_data = arrays['scaler_mean'] + np.outer(np.arange(-2, 3), arrays['scaler_scale'])
+    parity = check_parity(fast_model, model, scaler, np.asarray(check_data, dtype=np.float64))
+    if not parity['passed']:
+        raise BundleError(f"Bundle parity check failed: max diff {parity['max_abs_diff']}")
+
+    offsets = {}
+    chunks = []
+    position = 0
+    for name in ARRAY_NAMES:
+        values = np.ascontiguousarray(arrays[name], dtype='<f8')
+        offsets[name] = [position, int(values.size)]
+        position += values.size
+        chunks.append(values.tobytes())
+    data = b''.join(chunks)
+    checksum = hashlib.sha256(data).hexdigest()
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'version': version or f'lr-{checksum[:12]}',
+        'model_type': type(model).__name__,
+        'created_at': datetime.utcnow().isoformat(),
+        'feature_names': feature_names,
+        'classes': np.asarray(model.classes_).tolist(),
+        'arrays': offsets,
+        'n_values': position,
+        'sha256': checksum,
+        'pickle_sha256': pickle_sha256,
+        'parity_max_abs_diff': parity['max_abs_diff']
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    # Pad the header so the float64 data starts on an 8-byte boundary
+    header_bytes += b' ' * (-(len(MAGIC) + 4 + len(header_bytes)) % 8)
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(data)
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_bundle(path, verify=True):
+    """Read a bundle header and memory-map its arrays; raises BundleError if invalid"""
+    path = Path(path)
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise BundleError(f'Not a model bundle: {path}')
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length))
+
+    if header.get('format_version') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format version: {header.get('format_version')}")
+
+    values = np.memmap(path, dtype='<f8', mode='r', offset=len(MAGIC) + 4 + header_length, shape=(header['n_values'],))
+    if verify and hashlib.sha256(values.tobytes()).hexdigest() != header['sha256']:
+        raise BundleError(f'Bundle checksum mismatch: {path}')
+
+    arrays = {name: values[start:start + size] for name, (start, size) in header['arrays'].items()}
+    return header, arrays
+
+
+def fast_model_from_bundle(header, arrays):
+    """Build the closed-form model described by a bundle"""
+    return FoldedLogisticModel.from_params(
+        arrays['scaler_mean'], arrays['scaler_scale'], arrays['coef'], arrays['intercept'], header['classes']
+    )
@@ -0,0 +1,222 @@
+"""
+Model loading for the prediction service
+
+Prefers the single-file model bundle, which loads without sklearn. The joblib
+pickles are the fallback, and are also loaded on demand for parity checks.
+A bundle is only used while the pickles next to it are the ones it was built
+from; after a retrain that replaced only the pickles, the pickles are served.
+"""
+
+import hashlib
+import logging
+import os
+from contextlib import nullcontext
+from pathlib import Path
+import numpy as np
+from inference import FoldedLogisticModel, LookupLogisticModel, check_against, check_parity
+from model_bundle import BUNDLE_FILE, BundleError, read_bundle, fast_model_from_bundle
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model_final.pkl"
+SCALER_FILE = "scaler_final.pkl"
+
+
+def candidate_model_dirs():
+    """Directories searched for the model files, in order"""
+    current_dir = Path(__file__).parent
+    paths = [
+        current_dir.parent / "model",  # /app/model (from volume mount)
+        Path("/app/model"),  # Direct path
+        Path("./model"),  # Current working directory
+    ]
+    if os.getenv('MODEL_DIR'):
+        paths.insert(0, Path(os.getenv('MODEL_DIR')))
+    return paths
+
+
+def load_pickles(path):
+    """Unpickle the sklearn model and scaler from a directory"""
+    # joblib (and sklearn, via unpickling) is only imported when pickles are needed
+    import joblib
+
+    return joblib.load(path / MODEL_FILE), joblib.load(path / SCALER_FILE)
+
+
+def pickle_digest(path):
+    """sha256 of a model/scaler pickle pair, or None if either file is missing"""
+    digest = hashlib.sha256()
+    for name in (MODEL_FILE, SCALER_FILE):
+        try:
+            digest.update((path / name).read_bytes())
+        except FileNotFoundError:
+            return None
+    return digest.hexdigest()
+
+
+def pickle_version(path):
+    """Content-derived version id for a model/scaler pickle pair"""
+    return f'pkl-{pickle_digest(path)[:12]}'
+
+
+def build_fast_model(model, scaler):
+    """Fold the scaler into the model so requests skip sklearn's per-call validation"""
+    fast_model = FoldedLogisticModel.from_sklearn(model, scaler)
+    if fast_model is None:
+        logger.info("%s cannot be folded, using sklearn inference", type(model).__name__)
+        return None
+
+    # Probe a few points around the training mean before trusting the folded weights
+    probe = scaler.mean_ + np.outer(np.arange(-2, 3), scaler.scale_)
+    if not check_parity(fast_model, model, scaler, probe)['passed']:
+        logger.error("Closed-form inference disagrees with sklearn, using sklearn inference")
+        return None
+
+    logger.info("Closed-form inference path enabled")
+    return fast_model
+
+
+class LoadedModel:
+    """A servable model: the closed-form fast path and/or the sklearn model/scaler pair"""
+
+    def __init__(self, model=None, scaler=None, source=None, fast_model=None, version=None, feature_names=None,
+                 pickle_sha256=None):
+        self.model = model
+        self.scaler = scaler
+        self.source = source
+        self.version = version
+        self.feature_names = feature_names
+        self.pickle_sha256 = pickle_sha256
+        if fast_model is None and model is not None:
+            fast_model = build_fast_model(model, scaler)
+        self.fast_model = fast_model
+
+    @classmethod
+    def from_bundle(cls, path):
+        """Load a model bundle file; raises BundleError if it is invalid"""
+        header, arrays = read_bundle(path)
+        return cls(
+            source=path.parent,
+            fast_model=fast_model_from_bundle(header, arrays),
+            version=header['version'],
+            feature_names=header['feature_names'],
+            pickle_sha256=header.get('pickle_sha256')
+        )
+
+    @property
+    def inference_engine(self):
+        return self.fast_model.engine if self.fast_model is not None else 'sklearn'
+
+    def select_engine(self, engine, feature_info=None, approximate=False, quant_steps=1024):
+        """Switch to the 'closed_form', 'lookup' or 'sklearn' engine; unusable engines are logged and skipped"""
+        folded = self.fast_model.folded if isinstance(self.fast_model, LookupLogisticModel) else self.fast_model
+        if engine == 'sklearn':
+            self.sklearn_pair()
+            self.fast_model = None
+        elif engine == 'lookup':
+            if folded is None or feature_info is None or self.feature_names is None:
+                logger.warning("Lookup engine needs a logistic model and feature metadata, using %s",
+                               self.inference_engine)
+                return
+            lookup = LookupLogisticModel.from_feature_info(
+                folded, feature_info, self.feature_names, approximate, quant_steps
+            )
+            # Every table entry is checked against the folded weights before it is served
+            parity = check_against(lookup, folded, lookup.grid(), lookup.tolerance)
+            if not parity['passed']:
+                logger.error("Lookup table disagrees with the folded model (max diff %s), using closed_form",
+                             parity['max_abs_diff'])
+                return
+            self.fast_model = lookup
+        else:
+            self.fast_model = folded
+        logger.info("Model %s uses the %s inference engine", self.version, self.inference_engine)
+
+    def sklearn_pair(self):
+        """The sklearn model and scaler, unpickled on first use for bundle-loaded models
+
+        Raises BundleError when the pickles on disk are not the ones the bundle was built from.
+        """
+        if self.model is None:
+            pickles = pickle_digest(self.source)
+            if pickles is None or pickles != self.pickle_sha256:
+                raise BundleError(
+                    f'Pickles in {self.source} do not match model {self.version}; '
+                    f'reload the model or rebuild the bundle with export_bundle.py'
+                )
+            self.model, self.scaler = load_pickles(self.source)
+        return self.model, self.scaler
+
+    def predict_matrix(self, features_array):
+        """Scale a feature matrix and score it with a single model call"""
+        if self.fast_model is not None:
+            probabilities = self.fast_model.predict_proba(features_array)
+            predictions = self.fast_model.classes_[(probabilities[:, 1] > 0.5).astype(int)]
+            return predictions, probabilities
+
+        features_scaled = self.scaler.transform(features_array)
+        probabilities = self.model.predict_proba(features_scaled)
+        # Same decision as model.predict, without a second pass over the matrix
+        predictions = self.model.classes_[probabilities.argmax(axis=1)]
+        return predictions, probabilities
+
+    def predict_features(self, features, timer=None):
+        """Score a single record given as a list of floats, optionally timing scale/inference stages"""
+        if self.fast_model is not None:
+            # Scaling is folded into the weights, so the whole call is inference
+            with timer.stage('inference') if timer is not None else nullcontext():
+                positive = self.fast_model.predict_one(features)
+                prediction = self.fast_model.classes_[1] if positive > 0.5 else self.fast_model.classes_[0]
+            return prediction, (1.0 - positive, positive)
+
+        with timer.stage('scale') if timer is not None else nullcontext():
+            features_scaled = self.scaler.transform(np.array(features).reshape(1, -1))
+        with timer.stage('inference') if timer is not None else nullcontext():
+            probabilities = self.model.predict_proba(features_scaled)
+            predictions = self.model.classes_[probabilities.argmax(axis=1)]
+        return predictions[0], probabilities[0]
+
+    def check_parity(self, features_array):
+        """Compare the fast path with sklearn on a feature matrix"""
+        model, scaler = self.sklearn_pair()
+        return check_parity(self.fast_model, model, scaler, features_array, self.fast_model.tolerance)
+
+
+def load_model(paths=None, feature_names=None):
+    """Load the bundle, or else the pickles, from the first directory that has them"""
+    for path in paths or candidate_model_dirs():
+        bundle_file = path / BUNDLE_FILE
+        if bundle_file.exists():
+            try:
+                loaded_model = LoadedModel.from_bundle(bundle_file)
+                if feature_names is not None and loaded_model.feature_names != list(feature_names):
+                    raise BundleError(f'Feature order mismatch: {loaded_model.feature_names}')
+                pickles = pickle_digest(path)
+                if pickles is not None and pickles != loaded_model.pickle_sha256:
+                    # The pickles were replaced (or the bundle predates pickle digests): serve the pickles
+                    raise BundleError(
+                        f'Bundle {loaded_model.version} was not built from the pickles in {path}; '
+                        f'serving the pickles (run export_bundle.py to rebuild the bundle)'
+                    )
+                logger.info("Model bundle %s loaded from: %s", loaded_model.version, bundle_file)
+                return loaded_model
+            except (BundleError, OSError, ValueError, KeyError) as e:
+                logger.error("Error loading model bundle from %s: %s", bundle_file, e)
+
+        if not ((path / MODEL_FILE).exists() and (path / SCALER_FILE).exists()):
+            continue
+
+        try:
+            model, scaler = load_pickles(path)
+        except Exception as e:
+            logger.error("Error loading model from %s: %s", path, e)
+            continue
+
+        logger.info("Model and scaler loaded from: %s", path)
+        return LoadedModel(
+            model, scaler, source=path, version=pickle_version(path),
+            feature_names=list(feature_names) if feature_names is not None else None
+        )
+
+    logger.error("Failed to load model and scaler from all possible paths")
+    return None
@@ -0,0 +1,250 @@
+"""
+Model registry with background hot reload
+
+The registry owns the model currently being served. New versions are loaded
+and validated in the background (watching the model directory, or on demand
+from the admin endpoint) and then swapped in with a single reference
+assignment, so in-flight requests keep the model they started with.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from model_bundle import BUNDLE_FILE
+from model_loader import MODEL_FILE, SCALER_FILE, candidate_model_dirs, load_model
+
+logger = logging.getLogger(__name__)
+
+
+class ModelValidationError(Exception):
+    """Raised when a candidate model fails its warm-up/validation pass"""
+
+
+class ModelRegistry:
+    """Serves the active model version and keeps recent versions for rollback"""
+
+    def __init__(self, feature_names, model_dirs=None, holdout_path=None, holdout_fraction=0.2,
+                 min_accuracy=0.7, poll_interval=5.0, keep_versions=3, engine='closed_form',
+                 feature_info=None, lookup_approximate=False, lookup_quant_steps=1024):
+        self.feature_names = list(feature_names)
+        self.model_dirs = model_dirs
+        self.holdout_path = Path(holdout_path) if holdout_path else None
+        self.holdout_fraction = holdout_fraction
+        self.min_accuracy = min_accuracy
+        self.poll_interval = poll_interval
+        self.keep_versions = keep_versions
+        self.engine = engine
+        self.feature_info = feature_info
+        self.lookup_approximate = lookup_approximate
+        self.lookup_quant_steps = lookup_quant_steps
+
+        self._current = None
+        self._versions = {}  # version -> {'model': LoadedModel, 'info': dict}, oldest first
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._holdout = None
+        self._fingerprint = None
+        self._watch_thread = None
+        self._watch_pid = None
+
+        self.reloads = 0
+        self.failed_reloads = 0
+
+    @classmethod
+    def from_config(cls, app, feature_names, feature_info=None):
+        """Build a registry from MODEL_*, INFERENCE_ENGINE and LOOKUP_* settings in the app config"""
+        return cls(
+            feature_names,
+            holdout_path=app.config['HEART_DATA_PATH'],
+            holdout_fraction=app.config['MODEL_HOLDOUT_FRACTION'],
+            min_accuracy=app.config['MODEL_MIN_ACCURACY'],
+            poll_interval=app.config['MODEL_WATCH_INTERVAL'],
+            keep_versions=app.config['MODEL_REGISTRY_KEEP'],
+            engine=app.config['INFERENCE_ENGINE'],
+            feature_info=feature_info,
+            lookup_approximate=app.config['LOOKUP_APPROXIMATE'],
+            lookup_quant_steps=app.config['LOOKUP_QUANT_STEPS']
+        )
+
+    @property
+    def current(self):
+        """The active LoadedModel, or None if nothing could be loaded"""
+        if self.poll_interval and self._watch_pid != os.getpid():
+            self._start_watcher()
+        return self._current
+
+    def load_initial(self):
+        """Load and activate the model at startup; validation failures are logged, not fatal"""
+        self._fingerprint = self._model_fingerprint()
+        loaded_model = self._load()
+        if loaded_model is None:
+            return None
+
+        try:
+            validation = self.validate(loaded_model)
+        except ModelValidationError as e:
+            logger.warning("Serving model %s although validation failed: %s", loaded_model.version, e)
+            validation = {'passed': False, 'error': str(e)}
+        self._activate(loaded_model, validation)
+        return loaded_model
+
+    def reload(self):
+        """Load the model files again and swap them in if they validate; returns version info"""
+        # Loading and validation happen outside self._lock so requests are never blocked
+        with self._reload_lock:
+            return self._reload()
+
+    def _reload(self):
+        self._fingerprint = self._model_fingerprint()
+        loaded_model = self._load()
+        if loaded_model is None:
+            with self._lock:
+                self.failed_reloads += 1
+            raise ModelValidationError('No loadable model found')
+
+        current = self._current
+        if current is not None and loaded_model.version == current.version:
+            return self._versions[current.version]['info']
+
+        try:
+            validation = self.validate(loaded_model)
+        except ModelValidationError:
+            with self._lock:
+                self.failed_reloads += 1
+            raise
+
+        info = self._activate(loaded_model, validation)
+        with self._lock:
+            self.reloads += 1
+        logger.info("Model %s activated", loaded_model.version)
+        return info
+
+    def _load(self):
+        loaded_model = load_model(self.model_dirs, self.feature_names)
+        if loaded_model is not None:
+            loaded_model.select_engine(
+                self.engine, self.feature_info, self.lookup_approximate, self.lookup_quant_steps
+            )
+        return loaded_model
+
+    def activate(self, version):
+        """Switch back to a version that is still held in memory"""
+        with self._lock:
+            entry = self._versions.get(version)
+            if entry is None:
+                raise KeyError(version)
+            self._current = entry['model']
+            entry['info']['activated_at'] = datetime.utcnow().isoformat()
+            return entry['info']
+
+    def validate(self, loaded_model):
+        """Warm up the model and score the holdout slice; raises ModelValidationError"""
+        features, labels = self._load_holdout()
+        started = time.perf_counter()
+        predictions, probabilities = loaded_model.predict_matrix(features)
+        # Warm the single-record path as well, it is what /predict uses
+        for row in features[:10].tolist():
+            loaded_model.predict_features(row)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        positive = np.asarray(probabilities)[:, 1]
+        if not np.all(np.isfinite(positive)) or positive.min() < 0 or positive.max() > 1:
+            raise ModelValidationError('Model produced invalid probabilities')
+
+        result = {'passed': True, 'rows': int(features.shape[0]), 'warmup_ms': round(elapsed_ms, 3)}
+        if labels is not None:
+            accuracy = float(np.mean(predictions == labels))
+            result['accuracy'] = round(accuracy, 4)
+            if accuracy < self.min_accuracy:
+                raise ModelValidationError(f'Holdout accuracy {accuracy:.3f} below {self.min_accuracy}')
+        return result
+
+    def list_versions(self):
+        """Info for every version held in memory, oldest first"""
+        current = self._current
+        with self._lock:
+            return [
+                dict(entry['info'], active=entry['model'] is current)
+                for entry in self._versions.values()
+            ]
+
+    def stats(self):
+        current = self._current
+        return {
+            'active_version': current.version if current is not None else None,
+            'versions_loaded': len(self._versions),
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'watching': bool(self.poll_interval)
+        }
+
+    def _activate(self, loaded_model, validation):
+        info = {
+            'version': loaded_model.version,
+            'source': str(loaded_model.source),
+            'inference_engine': loaded_model.inference_engine,
+            'loaded_at': datetime.utcnow().isoformat(),
+            'activated_at': datetime.utcnow().isoformat(),
+            'validation': validation
+        }
+        with self._lock:
+            self._versions.pop(loaded_model.version, None)
+            self._versions[loaded_model.version] = {'model': loaded_model, 'info': info}
+            # Atomic swap: requests read self._current once and keep that model
+            self._current = loaded_model
+            while len(self._versions) > self.keep_versions:
+                oldest = next(iter(self._versions))
+                if self._versions[oldest]['model'] is loaded_model:
+                    break
+                del self._versions[oldest]
+        return info
+
+    def _load_holdout(self):
+        """Deterministic holdout slice of the dataset, or a synthetic probe if it is missing"""
+        if self._holdout is None:
+            if self.holdout_path is not None and self.holdout_path.exists():
+                dataset = np.loadtxt(self.holdout_path, delimiter=',', skiprows=1, ndmin=2)
+                order = np.random.default_rng(42).permutation(dataset.shape[0])
+                size = max(1, int(len(order) * self.holdout_fraction))
+                holdout = dataset[order[:size]]
+                labels = holdout[:, len(self.feature_names)] if holdout.shape[1] > len(self.feature_names) else None
+                self._holdout = (holdout[:, :len(self.feature_names)], labels)
+            else:
+                logger.warning("Holdout data not found at %s, validating on a synthetic probe", self.holdout_path)
+                probe = np.tile(np.linspace(0, 1, 5)[:, None], (1, len(self.feature_names)))
+                self._holdout = (probe * 100, None)
+        return self._holdout
+
+    def _model_fingerprint(self):
+        fingerprint = []
+        for path in self.model_dirs or candidate_model_dirs():
+            for name in (BUNDLE_FILE, MODEL_FILE, SCALER_FILE):
+                try:
+                    stat = (path / name).stat()
+                except OSError:
+                    continue
+                fingerprint.append((str(path / name), stat.st_mtime_ns, stat.st_size))
+        return tuple(fingerprint)
+
+    def _start_watcher(self):
+        # Threads do not survive fork, so each worker process watches on its own
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+            self._watch_thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watch_thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                if self._model_fingerprint() != self._fingerprint:
+                    logger.info("Model files changed, reloading")
+                    self.reload()
+            except Exception as e:
+                logger.error("Model reload failed, keeping %s: %s", self._current.version if self._current else None, e)
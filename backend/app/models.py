@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
+import uuid
+from database import RoutingSession
+from schema import FEATURE_NAMES, RECORD_SCHEMA
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -19,13 +22,30 @@ class User(db.Model):
             'id': self.id,
             'session_id': self.session_id,
             'created_at': self.created_at.isoformat(),
-            'predictions_count': len(self.predictions)
+            'predictions_count': self.count_predictions()
         }
 
+    def count_predictions(self):
+        """Count predictions in SQL instead of loading the relationship"""
+        session = db.object_session(self) or db.session
+        return session.query(db.func.count(Prediction.id)).filter(Prediction.user_id == self.id).scalar()
+
 class Prediction(db.Model):
     __tablename__ = 'predictions'
+    # Named as in migration 0002, so create_all() and the migrations build the same schema
+    __table_args__ = (db.UniqueConstraint('public_id', name='uq_predictions_public_id'),)
+
+    # Column order for flat (CSV) exports
+    CSV_COLUMNS = [
+        'id', 'prediction_id', 'created_at',
+        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs',
+        'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal',
+        'prediction', 'risk_percentage', 'risk_level', 'confidence', 'model_version'
+    ]
     
     id = db.Column(db.Integer, primary_key=True)
+    # Stable identifier returned to clients before the row is written
+    public_id = db.Column(db.String(36), default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Input features
@@ -48,6 +68,11 @@ class Prediction(db.Model):
     risk_percentage = db.Column(db.Float, nullable=False)
     risk_level = db.Column(db.String(50), nullable=False)  # Low, Moderate, High
     confidence = db.Column(db.Float, nullable=False)
+    model_version = db.Column(db.String(64))  # Model that produced this prediction
+
+    # Ground truth from follow-up, recorded later; labeled rows feed incremental training
+    outcome = db.Column(db.Integer)  # 0 or 1, NULL until known
+    outcome_recorded_at = db.Column(db.DateTime, index=True)
     
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -57,6 +82,7 @@ class Prediction(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'prediction_id': self.public_id,
             'user_id': self.user_id,
             'input_features': {
                 'age': self.age,
@@ -77,37 +103,134 @@ class Prediction(db.Model):
                 'prediction': self.prediction,
                 'risk_percentage': self.risk_percentage,
                 'risk_level': self.risk_level,
-                'confidence': self.confidence
+                'confidence': self.confidence,
+                'model_version': self.model_version
             },
             'created_at': self.created_at.isoformat(),
             'ip_address': self.ip_address
         }
     
+    def to_csv_row(self):
+        """Flat row matching CSV_COLUMNS"""
+        return [
+            self.id, self.public_id, self.created_at.isoformat(),
+            self.age, self.sex, self.cp, self.trestbps, self.chol, self.fbs,
+            self.restecg, self.thalach, self.exang, self.oldpeak, self.slope, self.ca, self.thal,
+            self.prediction, self.risk_percentage, self.risk_level, self.confidence, self.model_version
+        ]
+
     @classmethod
-    def create_from_request(cls, user_id, input_data, prediction_results, request_info):
-        """Create a prediction record from request data"""
-        return cls(
-            user_id=user_id,
+    def keyset_page(cls, user_id, limit, after=None, session=None):
+        """Newest-first predictions for a user, continuing after a (created_at, id) key"""
+        query = (session or db.session).query(cls).filter(cls.user_id == user_id)
+        if after is not None:
+            query = query.filter(db.tuple_(cls.created_at, cls.id) < after)
+        return query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit).all()
+
+    @classmethod
+    def record_outcomes(cls, outcomes, recorded_at=None):
+        """Set ground-truth outcomes from {public_id: 0 or 1}; returns the public ids that were found"""
+        recorded_at = recorded_at or datetime.utcnow()
+        table = cls.__table__
+        found = set()
+        public_ids = list(outcomes)
+        # Chunked to stay below SQLite's bound-parameter limit
+        for start in range(0, len(public_ids), 900):
+            chunk = public_ids[start:start + 900]
+            found.update(db.session.execute(
+                db.select(table.c.public_id).where(table.c.public_id.in_(chunk))
+            ).scalars())
+        if found:
+            db.session.execute(
+                db.update(table)
+                .where(table.c.public_id == db.bindparam('b_public_id'))
+                .values(outcome=db.bindparam('b_outcome'), outcome_recorded_at=recorded_at),
+                [{'b_public_id': public_id, 'b_outcome': outcomes[public_id]} for public_id in found]
+            )
+        return found
+
+    @staticmethod
+    def row_from_request(user_id, input_data, prediction_results, request_info, public_id=None):
+        """Build a column mapping for a prediction, suitable for bulk inserts"""
+        # Callers pass the feature list RECORD_SCHEMA already produced; raw records are validated here
+        features = input_data if isinstance(input_data, list) else RECORD_SCHEMA.features(input_data)
+        return {
+            'public_id': public_id or str(uuid.uuid4()),
+            'user_id': user_id,
             # Input features
-            age=float(input_data['age']),
-            sex=float(input_data['sex']),
-            cp=float(input_data['cp']),
-            trestbps=float(input_data['trestbps']),
-            chol=float(input_data['chol']),
-            fbs=float(input_data['fbs']),
-            restecg=float(input_data['restecg']),
-            thalach=float(input_data['thalach']),
-            exang=float(input_data['exang']),
-            oldpeak=float(input_data['oldpeak']),
-            slope=float(input_data['slope']),
-            ca=float(input_data['ca']),
-            thal=float(input_data['thal']),
+            **dict(zip(FEATURE_NAMES, features)),
             # Prediction results
-            prediction=prediction_results['prediction'],
-            risk_percentage=prediction_results['risk_percentage'],
-            risk_level=prediction_results['risk_level'],
-            confidence=float(prediction_results['interpretation']['confidence'].rstrip('%')),
+            'prediction': prediction_results['prediction'],
+            'risk_percentage': prediction_results['risk_percentage'],
+            'risk_level': prediction_results['risk_level'],
+            'confidence': float(prediction_results['interpretation']['confidence'].rstrip('%')),
+            'model_version': prediction_results.get('model_version'),
             # Metadata
-            ip_address=request_info.get('ip_address'),
-            user_agent=request_info.get('user_agent')
-        )
\ No newline at end of file
+            'created_at': datetime.utcnow(),
+            'ip_address': request_info.get('ip_address'),
+            'user_agent': request_info.get('user_agent')
+        }
+
+    @classmethod
+    def create_from_request(cls, user_id, input_data, prediction_results, request_info, public_id=None):
+        """Create a prediction record from request data"""
+        return cls(**cls.row_from_request(user_id, input_data, prediction_results, request_info, public_id))
+
+
+class PredictionStatsHourly(db.Model):
+    """Prediction volume and risk mix per hour, incremented as predictions are written"""
+    __tablename__ = 'prediction_stats_hourly'
+
+    # Maps Prediction.risk_level values to their counter columns
+    RISK_LEVEL_COLUMNS = {
+        'Low': 'low_risk',
+        'Moderate': 'moderate_risk',
+        'High': 'high_risk'
+    }
+
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    new_users = db.Column(db.Integer, nullable=False, default=0)
+    predictions = db.Column(db.Integer, nullable=False, default=0)
+    low_risk = db.Column(db.Integer, nullable=False, default=0)
+    moderate_risk = db.Column(db.Integer, nullable=False, default=0)
+    high_risk = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'new_users': self.new_users,
+            'predictions': self.predictions,
+            'risk_distribution': {
+                risk_level: getattr(self, column)
+                for risk_level, column in self.RISK_LEVEL_COLUMNS.items()
+            }
+        }
+
+class ShadowPrediction(db.Model):
+    """Challenger model output recorded next to a served prediction, for offline comparison"""
+    __tablename__ = 'shadow_predictions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    prediction_id = db.Column(db.String(36), index=True)  # Prediction.public_id of the served result
+    mode = db.Column(db.String(16), nullable=False)  # shadow or ab
+
+    served_version = db.Column(db.String(64))
+    served_prediction = db.Column(db.Integer, nullable=False)
+    served_risk_percentage = db.Column(db.Float, nullable=False)
+
+    shadow_version = db.Column(db.String(64))
+    shadow_prediction = db.Column(db.Integer, nullable=False)
+    shadow_risk_percentage = db.Column(db.Float, nullable=False)
+    shadow_latency_ms = db.Column(db.Float)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# /history and /export: filter_by(user_id) ordered newest-first, with id as the keyset tie-breaker
+db.Index(
+    'ix_predictions_user_id_created_at',
+    Prediction.user_id, Prediction.created_at.desc(), Prediction.id.desc()
+)
+
+# /stats time windows. Predictions are append-only, so on Postgres a BRIN index
+# stays tiny and still prunes by created_at; other databases get a B-tree.
+db.Index('ix_predictions_created_at', Prediction.created_at, postgresql_using='brin')
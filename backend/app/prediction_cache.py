@@ -0,0 +1,97 @@
+"""
+Memoizing cache for single-record predictions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with optional TTL, keyed on the normalized feature vector"""
+
+    def __init__(self, max_size=4096, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, app):
+        """Build a cache from PREDICTION_CACHE_* settings in the app config"""
+        return cls(
+            max_size=app.config['PREDICTION_CACHE_SIZE'],
+            ttl=app.config['PREDICTION_CACHE_TTL']
+        )
+
+    @staticmethod
+    def make_key(features):
+        # Adding 0.0 folds -0.0 into 0.0 so equal inputs share an entry
+        return tuple(float(value) + 0.0 for value in features)
+
+    def get(self, loaded_model, key):
+        """Cached result for key under loaded_model, or None"""
+        with self._lock:
+            self._check_model(loaded_model)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, loaded_model, key, value):
+        """Store a result computed by loaded_model"""
+        with self._lock:
+            self._check_model(loaded_model)
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Counters for health and metrics endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _check_model(self, loaded_model):
+        # Entries are only valid for the model that produced them
+        if loaded_model is not self._model:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._model = loaded_model
@@ -0,0 +1,154 @@
+"""
+Feature metadata and the request schema compiled from it
+
+RecordSchema turns FEATURE_INFO into one check per feature (type, then range
+or allowed options) when it is built, so validating a record is a single pass
+that reports every invalid field at once. The API, the batch paths and
+Prediction.create_from_request all share RECORD_SCHEMA.
+"""
+
+import math
+import numpy as np
+
+# Feature names in the same order as training data
+FEATURE_NAMES = [
+    'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs',
+    'restecg', 'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
+]
+
+# Feature descriptions for better UX; their ranges and options are also the validation rules
+FEATURE_INFO = {
+    'age': {'name': 'Age', 'unit': 'years', 'min': 1, 'max': 120},
+    'sex': {'name': 'Sex', 'options': {'1': 'Male', '0': 'Female'}},
+    'cp': {'name': 'Chest Pain Type', 'options': {
+        '1': 'Typical Angina',
+        '2': 'Atypical Angina',
+        '3': 'Non-Anginal Pain',
+        '4': 'Asymptomatic'
+    }},
+    'trestbps': {'name': 'Resting Blood Pressure', 'unit': 'mm Hg', 'min': 80, 'max': 200},
+    'chol': {'name': 'Cholesterol', 'unit': 'mg/dl', 'min': 100, 'max': 600},
+    'fbs': {'name': 'Fasting Blood Sugar > 120 mg/dl', 'options': {'1': 'True', '0': 'False'}},
+    'restecg': {'name': 'Resting ECG Results', 'options': {
+        '0': 'Normal',
+        '1': 'ST-T Wave Abnormality',
+        '2': 'Left Ventricular Hypertrophy'
+    }},
+    'thalach': {'name': 'Maximum Heart Rate Achieved', 'unit': 'bpm', 'min': 60, 'max': 220},
+    'exang': {'name': 'Exercise Induced Angina', 'options': {'1': 'Yes', '0': 'No'}},
+    'oldpeak': {'name': 'ST Depression Induced by Exercise', 'unit': 'mm', 'min': 0, 'max': 10},
+    'slope': {'name': 'Slope of Peak Exercise ST Segment', 'options': {
+        '1': 'Upsloping',
+        '2': 'Flat',
+        '3': 'Downsloping'
+    }},
+    'ca': {'name': 'Number of Major Vessels Colored by Fluoroscopy', 'options': {
+        '0': '0', '1': '1', '2': '2', '3': '3'
+    }},
+    'thal': {'name': 'Thalassemia', 'options': {
+        '3': 'Normal',
+        '6': 'Fixed Defect',
+        '7': 'Reversible Defect'
+    }}
+}
+
+
+class SchemaError(ValueError):
+    """A record failed validation; `errors` lists every invalid field"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(format_errors(errors))
+
+
+def format_errors(errors):
+    """One readable message for a list of field errors"""
+    return 'Invalid input: ' + '; '.join(f"{error['field']} {error['error']}" for error in errors)
+
+
+class RecordSchema:
+    """Validator for prediction records, compiled once from feature metadata"""
+
+    def __init__(self, feature_names, feature_info):
+        self.feature_names = list(feature_names)
+        self._checks = []
+        for name in self.feature_names:
+            info = feature_info[name]
+            if 'options' in info:
+                allowed = frozenset(float(value) for value in info['options'])
+                message = 'must be one of ' + ', '.join(sorted(info['options'], key=float))
+                self._checks.append((name, allowed, None, None, message))
+            else:
+                low, high = float(info['min']), float(info['max'])
+                self._checks.append((name, None, low, high, f"must be between {info['min']} and {info['max']}"))
+
+    def validate(self, record):
+        """(features, errors): the record's values as floats in feature order, or None and every problem found"""
+        if not isinstance(record, dict):
+            return None, [{'field': 'record', 'error': 'must be an object'}]
+
+        features = []
+        errors = []
+        for name, allowed, low, high, message in self._checks:
+            value = record.get(name)
+            if value is None:
+                errors.append({'field': name, 'error': 'is required'})
+                continue
+
+            # Exact type checks: bools are not numbers here, and CSV uploads send numbers as text
+            value_type = type(value)
+            try:
+                if value_type is not float and value_type is not int and value_type is not str:
+                    raise TypeError
+                number = float(value)
+            except (TypeError, ValueError, OverflowError):
+                errors.append({'field': name, 'error': 'must be a number', 'value': str(value)})
+                continue
+
+            if allowed is not None:
+                valid = number in allowed
+            else:
+                valid = low <= number <= high  # False for NaN
+            if not valid:
+                errors.append({
+                    'field': name, 'error': message, 'value': number if math.isfinite(number) else str(number)
+                })
+                continue
+            features.append(number)
+
+        if errors:
+            return None, errors
+        return features, []
+
+    def features(self, record):
+        """Validated feature list for a record; raises SchemaError listing every invalid field"""
+        features, errors = self.validate(record)
+        if errors:
+            raise SchemaError(errors)
+        return features
+
+    def validate_many(self, records):
+        """(features_array, errors) for a batch; errors are [{'index', 'error', 'fields'}] per invalid record"""
+        features_array = np.empty((len(records), len(self.feature_names)))
+        errors = []
+        for index, record in enumerate(records):
+            features, record_errors = self.validate(record)
+            if record_errors:
+                errors.append({'index': index, 'error': format_errors(record_errors), 'fields': record_errors})
+            else:
+                features_array[index] = features
+        return features_array, errors
+
+    def valid_rows(self, features_array):
+        """Boolean mask of the rows of a feature matrix that pass every check (NaN fails), for bulk scoring"""
+        valid = np.ones(len(features_array), dtype=bool)
+        for column, (name, allowed, low, high, message) in enumerate(self._checks):
+            values = features_array[:, column]
+            if allowed is not None:
+                valid &= np.isin(values, sorted(allowed))
+            else:
+                valid &= (values >= low) & (values <= high)
+        return valid
+
+
+RECORD_SCHEMA = RecordSchema(FEATURE_NAMES, FEATURE_INFO)
@@ -0,0 +1,189 @@
+"""
+Shadow and A/B model evaluation
+
+Requests hand their features and served result to a bounded queue once the
+response has been sent. Worker threads score queued records with the other
+model in batches and store both outputs in shadow_predictions, so the
+comparison never adds latency to the primary response. The scoring threads
+share the GIL with request threads, so their workload is capped: only
+sample_percent of served records are queued, and records arriving while the
+queue is full are dropped rather than waited for.
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert
+from models import db, ShadowPrediction
+
+logger = logging.getLogger(__name__)
+
+SHADOW_MODES = ('off', 'shadow', 'ab')
+
+
+class ShadowScorer:
+    """Scores requests with a second model off the request path"""
+
+    def __init__(self, app, challenger, mode='shadow', ab_percent=0, sample_percent=100, max_queue=1000,
+                 batch_size=200, flush_interval=1.0, workers=1):
+        if mode not in SHADOW_MODES:
+            raise ValueError(f'Unknown shadow mode: {mode}')
+        if not 0 <= sample_percent <= 100:
+            raise ValueError(f'Shadow sample percent must be between 0 and 100: {sample_percent}')
+
+        self.app = app
+        self.challenger = challenger
+        self.mode = mode
+        self.ab_percent = ab_percent
+        self.sample_percent = sample_percent
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.workers = workers
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+        self.submitted = 0
+        self.sampled_out = 0
+        self.scored = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, app, challenger):
+        """Build a scorer from SHADOW_* settings in the app config"""
+        return cls(
+            app,
+            challenger,
+            mode=app.config['SHADOW_MODE'],
+            ab_percent=app.config['AB_PERCENT'],
+            sample_percent=app.config['SHADOW_SAMPLE_PERCENT'],
+            max_queue=app.config['SHADOW_MAX_QUEUE'],
+            batch_size=app.config['SHADOW_BATCH_SIZE'],
+            workers=app.config['SHADOW_WORKERS']
+        )
+
+    def use_challenger(self, session_id):
+        """A/B assignment: a stable share of sessions is served by the challenger"""
+        if self.mode != 'ab' or not session_id:
+            return False
+        return zlib.crc32(session_id.encode('utf-8')) % 100 < self.ab_percent
+
+    def submit(self, prediction_id, features, served_model, served_result):
+        """Queue a served record for comparison against the other model; returns False if skipped or dropped"""
+        if self.sample_percent < 100 and random.random() * 100 >= self.sample_percent:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((prediction_id, features, served_model, served_result, datetime.utcnow()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self):
+        """Counters for health and metrics endpoints"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'ab_percent': self.ab_percent if self.mode == 'ab' else None,
+                'sample_percent': self.sample_percent,
+                'challenger_version': self.challenger.version,
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'submitted': self.submitted,
+                'sampled_out': self.sampled_out,
+                'scored': self.scored,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own pool
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'shadow-scorer-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        try:
+            # The record is compared against whichever model did not serve it
+            rows = []
+            for served_model, items in _group_by_model(batch):
+                other = self.challenger if served_model is not self.challenger else self.app.extensions['model_registry'].current
+                if other is None:
+                    continue
+                features = np.array([item[1] for item in items], dtype=np.float64)
+                started = time.perf_counter()
+                predictions, probabilities = other.predict_matrix(features)
+                latency_ms = (time.perf_counter() - started) * 1000 / len(items)
+
+                for (prediction_id, _, _, served_result, created_at), prediction, proba in zip(items, predictions, probabilities):
+                    rows.append({
+                        'prediction_id': prediction_id,
+                        'mode': self.mode,
+                        'served_version': served_model.version,
+                        'served_prediction': served_result['prediction'],
+                        'served_risk_percentage': served_result['risk_percentage'],
+                        'shadow_version': other.version,
+                        'shadow_prediction': int(prediction),
+                        'shadow_risk_percentage': round(float(proba[1] * 100), 2),
+                        'shadow_latency_ms': latency_ms,
+                        'created_at': created_at
+                    })
+
+            if rows:
+                with self.app.app_context():
+                    try:
+                        db.session.execute(insert(ShadowPrediction.__table__), rows)
+                        db.session.commit()
+                    finally:
+                        db.session.remove()
+            with self._lock:
+                self.scored += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            logger.error("Shadow scoring of %d records failed: %s", len(batch), e)
+
+
+def _group_by_model(batch):
+    groups = {}
+    for item in batch:
+        groups.setdefault(id(item[2]), (item[2], []))[1].append(item)
+    return groups.values()
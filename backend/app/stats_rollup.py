@@ -0,0 +1,156 @@
+"""
+Hourly rollup of prediction statistics
+
+Counters are incremented in the same transaction that writes predictions or
+users, so /stats reads a few hundred small rows instead of scanning predictions.
+
+Functions use the Flask-SQLAlchemy session unless another one is passed (the
+ASGI app passes the sync view of its AsyncSession).
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, User, Prediction, PredictionStatsHourly
+
+COUNTER_COLUMNS = ('new_users', 'predictions', 'low_risk', 'moderate_risk', 'high_risk')
+
+
+def hour_bucket(timestamp):
+    """Start of the hour containing timestamp"""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def increment(buckets, session=None):
+    """Add {bucket_start: Counter(column=n)} to the rollup; the caller commits"""
+    if not buckets:
+        return
+    session = session or db.session
+
+    rows = [
+        dict({column: counts.get(column, 0) for column in COUNTER_COLUMNS}, bucket_start=bucket_start)
+        for bucket_start, counts in buckets.items()
+    ]
+    table = PredictionStatsHourly.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.bucket_start],
+            set_={column: table.c[column] + statement.excluded[column] for column in COUNTER_COLUMNS}
+        )
+        session.execute(statement, rows)
+        return
+
+    # Other databases: update in place, insert buckets that don't exist yet
+    for row in rows:
+        updated = session.execute(
+            table.update()
+            .where(table.c.bucket_start == row['bucket_start'])
+            .values({column: table.c[column] + row[column] for column in COUNTER_COLUMNS})
+        )
+        if updated.rowcount == 0:
+            session.execute(table.insert(), [row])
+
+
+def record_predictions(rows, session=None):
+    """Count prediction rows (mappings with created_at and risk_level)"""
+    buckets = defaultdict(Counter)
+    for row in rows:
+        counts = buckets[hour_bucket(row['created_at'])]
+        counts['predictions'] += 1
+        column = PredictionStatsHourly.RISK_LEVEL_COLUMNS.get(row['risk_level'])
+        if column:
+            counts[column] += 1
+    increment(buckets, session)
+
+
+def record_new_users(count, created_at=None, session=None):
+    """Count newly created users"""
+    if count:
+        increment({hour_bucket(created_at or datetime.utcnow()): Counter(new_users=count)}, session)
+
+
+def summarize(now=None, session=None):
+    """Totals, risk distribution and trailing-24h volume from the rollup"""
+    now = now or datetime.utcnow()
+    session = session or db.session
+    totals = session.query(
+        *[func.coalesce(func.sum(PredictionStatsHourly.__table__.c[column]), 0) for column in COUNTER_COLUMNS]
+    ).one()
+    totals = dict(zip(COUNTER_COLUMNS, totals))
+
+    # Hour granularity: the current partial hour plus the 23 full hours before it
+    recent = session.query(
+        func.coalesce(func.sum(PredictionStatsHourly.predictions), 0)
+    ).filter(
+        PredictionStatsHourly.bucket_start >= hour_bucket(now) - timedelta(hours=23)
+    ).scalar()
+
+    return {
+        'total_users': int(totals['new_users']),
+        'total_predictions': int(totals['predictions']),
+        'recent_predictions_24h': int(recent),
+        'risk_distribution': {
+            risk_level: int(totals[column])
+            for risk_level, column in PredictionStatsHourly.RISK_LEVEL_COLUMNS.items()
+            if totals[column]
+        }
+    }
+
+
+def timeseries(hours, now=None, session=None):
+    """Hourly buckets for the last `hours` hours, oldest first, including empty hours"""
+    now = now or datetime.utcnow()
+    session = session or db.session
+    start = hour_bucket(now) - timedelta(hours=hours - 1)
+    stored = {
+        bucket.bucket_start: bucket
+        for bucket in session.query(PredictionStatsHourly).filter(PredictionStatsHourly.bucket_start >= start)
+    }
+
+    series = []
+    for offset in range(hours):
+        bucket_start = start + timedelta(hours=offset)
+        bucket = stored.get(bucket_start) or PredictionStatsHourly(
+            bucket_start=bucket_start, **{column: 0 for column in COUNTER_COLUMNS}
+        )
+        series.append(bucket.to_dict())
+    return series
+
+
+def rebuild(chunk_size=10000, archive_dir=None):
+    """Recompute the rollup from the users and predictions tables, plus archived predictions"""
+    buckets = defaultdict(Counter)
+
+    for (created_at,) in db.session.query(User.created_at).yield_per(chunk_size):
+        if created_at is not None:
+            buckets[hour_bucket(created_at)]['new_users'] += 1
+
+    for created_at, risk_level in db.session.query(Prediction.created_at, Prediction.risk_level).yield_per(chunk_size):
+        if created_at is None:
+            continue
+        counts = buckets[hour_bucket(created_at)]
+        counts['predictions'] += 1
+        column = PredictionStatsHourly.RISK_LEVEL_COLUMNS.get(risk_level)
+        if column:
+            counts[column] += 1
+
+    if archive_dir is not None and Path(archive_dir).exists():
+        from archive import archived_hourly_counts
+
+        for (bucket_start, risk_level), count in archived_hourly_counts(archive_dir).items():
+            counts = buckets[bucket_start]
+            counts['predictions'] += count
+            column = PredictionStatsHourly.RISK_LEVEL_COLUMNS.get(risk_level)
+            if column:
+                counts[column] += count
+
+    PredictionStatsHourly.query.delete()
+    increment(buckets)
+    db.session.commit()
+    return len(buckets)
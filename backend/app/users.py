@@ -0,0 +1,122 @@
+"""
+Session to user resolution
+
+Users are created with a single INSERT ... ON CONFLICT DO NOTHING RETURNING
+statement, so concurrent first requests for a session cannot race on the
+unique constraint, and resolved ids are cached in-process because a session's
+user id never changes.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, User
+import stats_rollup
+
+
+class UserIdCache:
+    """Thread-safe LRU map of session_id -> user_id"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, app):
+        """Build a cache from USER_CACHE_* settings in the app config"""
+        return cls(max_size=app.config['USER_CACHE_SIZE'])
+
+    def get_many(self, session_ids):
+        """Cached user ids for the given sessions; misses are left out"""
+        found = {}
+        with self._lock:
+            for session_id in session_ids:
+                user_id = self._entries.get(session_id)
+                if user_id is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                found[session_id] = user_id
+        return found
+
+    def put_many(self, user_ids):
+        """Remember committed session_id -> user_id pairs"""
+        with self._lock:
+            for session_id, user_id in user_ids.items():
+                self._entries[session_id] = user_id
+                self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Counters for health and metrics endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def upsert_users(session_ids, created_at=None, session=None):
+    """Map session ids to user ids, inserting missing users; the caller commits"""
+    session = session or db.session
+    session_ids = set(session_ids)
+    if not session_ids:
+        return {}
+
+    created_at = created_at or datetime.utcnow()
+    rows = [{'session_id': session_id, 'created_at': created_at} for session_id in sorted(session_ids)]
+    table = User.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = (
+            dialect_insert(table)
+            .on_conflict_do_nothing(index_elements=[table.c.session_id])
+            .returning(table.c.session_id, table.c.id)
+        )
+        user_ids = dict(session.execute(statement, rows).all())
+        stats_rollup.record_new_users(len(user_ids), created_at, session)
+    else:
+        # Other databases: insert what is missing, re-reading if another process got there first
+        user_ids = {}
+        for attempt in range(2):
+            existing = _select_user_ids(session, session_ids)
+            missing = [row for row in rows if row['session_id'] not in existing]
+            if not missing:
+                break
+            try:
+                with session.begin_nested():
+                    session.execute(insert(table), missing)
+                stats_rollup.record_new_users(len(missing), created_at, session)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    # Sessions that already existed (or were inserted concurrently) return no row above
+    remaining = session_ids - user_ids.keys()
+    if remaining:
+        user_ids.update(_select_user_ids(session, remaining))
+    return user_ids
+
+
+def _select_user_ids(session, session_ids):
+    return dict(
+        session.query(User.session_id, User.id)
+        .filter(User.session_id.in_(session_ids))
+        .all()
+    )
@@ -0,0 +1,190 @@
+"""
+Write-behind persistence for predictions
+
+Requests enqueue finished predictions and return immediately. A background
+flusher resolves users and bulk-inserts prediction rows in batches, triggered
+by batch size or by the flush interval, whichever comes first.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from sqlalchemy import insert
+from models import db, Prediction
+from users import upsert_users
+import stats_rollup
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_POLICIES = ('drop', 'block')
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue of prediction writes, flushed in batches"""
+
+    def __init__(self, app, max_size=10000, batch_size=500, flush_interval=0.5,
+                 backpressure='drop', block_timeout=0.05):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'Unknown backpressure policy: {backpressure}')
+
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    @classmethod
+    def from_config(cls, app):
+        """Build a queue from WRITE_BEHIND_* settings in the app config"""
+        return cls(
+            app,
+            max_size=app.config['WRITE_BEHIND_MAX_QUEUE'],
+            batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+            flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+            backpressure=app.config['WRITE_BEHIND_BACKPRESSURE'],
+            block_timeout=app.config['WRITE_BEHIND_BLOCK_TIMEOUT']
+        )
+
+    def submit(self, session_id, row):
+        """Queue a prediction row for the given session; returns False if it was dropped"""
+        self._ensure_started()
+        try:
+            if self.backpressure == 'block':
+                self._queue.put((session_id, row), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((session_id, row))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stats(self):
+        """Counters for health and metrics endpoints"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches
+            }
+
+    def stop(self, timeout=10.0):
+        """Stop the flusher and write out everything still queued"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own flusher
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+
+        # Drain whatever is left on shutdown
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _collect_batch(self):
+        """Wait for the first item, then gather more until size or time triggers a flush"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        with self.app.app_context():
+            try:
+                written = write_predictions(db.session, batch, self.app.extensions.get('user_cache'))
+                db.session.commit()
+                with self._lock:
+                    self.written += written
+                    self.batches += 1
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self.failed += len(batch)
+                logger.error("Write-behind flush of %d predictions failed: %s", len(batch), e)
+            finally:
+                db.session.remove()
+
+
+def write_predictions(session, batch, user_cache=None):
+    """Insert (session_id, row) pairs, creating missing users; the caller commits. Returns the row count"""
+    user_ids = resolve_users(session, {session_id for session_id, _ in batch}, user_cache)
+    rows = [dict(row, user_id=user_ids[session_id]) for session_id, row in batch]
+
+    session.execute(insert(Prediction.__table__), rows)
+    stats_rollup.record_predictions(rows, session)
+    return len(rows)
+
+
+def resolve_users(session, session_ids, user_cache=None):
+    """Map session ids to user ids, creating missing users in one upsert"""
+    user_ids = user_cache.get_many(session_ids) if user_cache is not None else {}
+    missing = session_ids - user_ids.keys()
+    if missing:
+        resolved = upsert_users(missing, session=session)
+        session.commit()
+        if user_cache is not None:
+            user_cache.put_many(resolved)
+        user_ids.update(resolved)
+    return user_ids
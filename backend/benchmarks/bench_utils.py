@@ -0,0 +1,60 @@
+"""
+Shared helpers for the benchmark scripts: percentiles and run metadata
+"""
+
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(timings, unit='ms', digits=3):
+    """Mean, p50/p95/p99 and max of a list of timings already expressed in `unit`"""
+    timings = sorted(timings)
+    if not timings:
+        return {'count': 0}
+    return {
+        'count': len(timings),
+        f'mean_{unit}': round(sum(timings) / len(timings), digits),
+        f'p50_{unit}': round(percentile(timings, 0.50), digits),
+        f'p95_{unit}': round(percentile(timings, 0.95), digits),
+        f'p99_{unit}': round(percentile(timings, 0.99), digits),
+        f'max_{unit}': round(timings[-1], digits)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(**extra):
+    """Where and when a result was produced, so runs can be compared across commits"""
+    metadata = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'argv': sys.argv[1:]
+    }
+    metadata.update(extra)
+    return metadata
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark JSON results and fail on regressions
+
+Works with the output of micro_inference.py and load_test.py. Latency metrics
+(*_ms, *_us) regress when they grow, throughput metrics (throughput_rps,
+ops_per_sec) when they shrink, by more than --threshold percent.
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ('_ms', '_us')
+HIGHER_IS_BETTER = ('throughput_rps', 'ops_per_sec')
+
+
+def gated_metrics(metrics, names):
+    for name in names or metrics:
+        if name in metrics and (name.endswith(LOWER_IS_BETTER) or name in HIGHER_IS_BETTER):
+            yield name
+
+
+def compare(baseline, candidate, threshold, metric_names):
+    """Rows of (benchmark, metric, baseline, candidate, change %, regressed)"""
+    rows = []
+    for benchmark, base_metrics in baseline['results'].items():
+        new_metrics = candidate['results'].get(benchmark)
+        if new_metrics is None:
+            continue
+        for metric in gated_metrics(base_metrics, metric_names):
+            old, new = base_metrics[metric], new_metrics.get(metric)
+            if new is None or not old:
+                continue
+            change = (new - old) / old * 100
+            worse = change if metric.endswith(LOWER_IS_BETTER) else -change
+            rows.append((benchmark, metric, old, new, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help='result JSON from the reference commit')
+    parser.add_argument('candidate', help='result JSON from the commit under test')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent')
+    parser.add_argument('--metric', action='append', dest='metrics',
+                        help='only gate on this metric, e.g. p99_ms (repeatable; default: all latency/throughput)')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        sys.exit(f"❌ Cannot compare {baseline.get('benchmark')} with {candidate.get('benchmark')}")
+
+    rows = compare(baseline, candidate, args.threshold, args.metrics)
+    print(f"{'benchmark':<34} {'metric':<16} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for benchmark, metric, old, new, change, regressed in rows:
+        flag = '  ❌' if regressed else ''
+        print(f"{benchmark:<34} {metric:<16} {old:>12} {new:>12} {change:>+8.1f}%{flag}")
+
+    regressions = sum(1 for row in rows if row[5])
+    print(json.dumps({
+        'baseline_commit': baseline.get('metadata', {}).get('commit'),
+        'candidate_commit': candidate.get('metadata', {}).get('commit'),
+        'threshold_percent': args.threshold,
+        'compared': len(rows),
+        'regressions': regressions
+    }))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
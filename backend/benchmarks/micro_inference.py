@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the single-record inference path
+
+Times each step /predict performs for one record (schema validation, scaling,
+sklearn, closed-form and lookup-table scoring, building and serializing the Prediction row)
+in isolation, and prints per-call latency as JSON.
+
+    python benchmarks/micro_inference.py --output micro.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+import numpy as np
+from bench_utils import latency_summary, run_metadata
+from app import FEATURE_INFO, FEATURE_NAMES, build_prediction_response
+from json_provider import orjson
+from schema import RECORD_SCHEMA
+from inference import FoldedLogisticModel, LookupLogisticModel
+from model_loader import load_model
+from models import Prediction
+
+SAMPLE_RECORD = {
+    'age': 63, 'sex': 1, 'cp': 1, 'trestbps': 145, 'chol': 233, 'fbs': 1, 'restecg': 2,
+    'thalach': 150, 'exang': 0, 'oldpeak': 2.3, 'slope': 3, 'ca': 0, 'thal': 6
+}
+REQUEST_INFO = {'ip_address': '127.0.0.1', 'user_agent': 'micro-benchmark'}
+
+
+def time_call(fn, samples, min_sample_seconds):
+    """Per-call latency in microseconds over `samples` timed batches of calls"""
+    # Size batches so each one is long enough for perf_counter resolution not to matter
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_sample_seconds:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) * 1e6 / number)
+
+    result = latency_summary(timings, unit='us')
+    result['calls_per_sample'] = number
+    result['ops_per_sec'] = round(1e6 / result['p50_us'], 1)
+    return result
+
+
+def build_cases(loaded_model, batch_rows):
+    model, scaler = loaded_model.sklearn_pair()
+    features = RECORD_SCHEMA.features(SAMPLE_RECORD)
+    features_array = np.array(features).reshape(1, -1)
+    features_scaled = scaler.transform(features_array)
+    batch = np.tile(features_array, (batch_rows, 1))
+    prediction, prediction_proba = loaded_model.predict_features(features)
+    response_data = build_prediction_response(prediction, prediction_proba)
+    response_data['model_version'] = loaded_model.version
+    record = Prediction.create_from_request(1, SAMPLE_RECORD, response_data, REQUEST_INFO)
+
+    cases = {
+        'schema_validation': lambda: RECORD_SCHEMA.validate(SAMPLE_RECORD),
+        'scaler_transform': lambda: scaler.transform(features_array),
+        'sklearn_predict': lambda: model.predict(features_scaled),
+        'sklearn_predict_proba': lambda: model.predict_proba(features_scaled),
+        'served_predict_features': lambda: loaded_model.predict_features(features),
+        f'served_predict_matrix_{batch_rows}': lambda: loaded_model.predict_matrix(batch),
+        'build_prediction_response': lambda: build_prediction_response(prediction, prediction_proba),
+        'prediction_create_from_request': lambda: Prediction.create_from_request(
+            1, SAMPLE_RECORD, response_data, REQUEST_INFO
+        ),
+        'prediction_to_dict': record.to_dict,
+        'prediction_to_dict_json': lambda: json.dumps(record.to_dict()),
+        'response_json_stdlib': lambda: json.dumps(response_data, sort_keys=True, separators=(',', ':'))
+    }
+    if orjson is not None:
+        cases['response_json_orjson'] = lambda: orjson.dumps(response_data, option=orjson.OPT_SORT_KEYS)
+    folded = FoldedLogisticModel.from_sklearn(model, scaler)
+    if folded is not None:
+        cases['closed_form_predict_one'] = lambda: folded.predict_one(features)
+        cases['closed_form_predict_proba'] = lambda: folded.predict_proba(features_array)
+        cases[f'closed_form_predict_proba_{batch_rows}'] = lambda: folded.predict_proba(batch)
+        for approximate, prefix in ((False, 'lookup'), (True, 'lookup_approximate')):
+            lookup = LookupLogisticModel.from_feature_info(folded, FEATURE_INFO, FEATURE_NAMES, approximate)
+            cases[f'{prefix}_predict_one'] = lambda lookup=lookup: lookup.predict_one(features)
+            cases[f'{prefix}_predict_proba_{batch_rows}'] = lambda lookup=lookup: lookup.predict_proba(batch)
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=30, help='timed batches per benchmark')
+    parser.add_argument('--min-sample-ms', type=float, default=20.0, help='minimum duration of one timed batch')
+    parser.add_argument('--batch-rows', type=int, default=1000, help='rows in the predict_matrix benchmark')
+    parser.add_argument('--only', action='append', help='run only benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--output', help='write the JSON result to this file as well as stdout')
+    args = parser.parse_args()
+
+    # The committed pickles predate the installed sklearn; the warning is noise here
+    warnings.filterwarnings('ignore', module='sklearn')
+    loaded_model = load_model(feature_names=FEATURE_NAMES)
+    if loaded_model is None:
+        sys.exit("❌ No model found (set MODEL_DIR)")
+
+    results = {}
+    for name, fn in build_cases(loaded_model, args.batch_rows).items():
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        fn()  # warm up
+        results[name] = time_call(fn, args.samples, args.min_sample_ms / 1000)
+        print(f"⏱️ {name}: {results[name]['p50_us']} µs", file=sys.stderr)
+
+    output = json.dumps({
+        'benchmark': 'micro_inference',
+        'metadata': run_metadata(
+            model_version=loaded_model.version,
+            inference_engine=loaded_model.inference_engine,
+            numpy=np.__version__
+        ),
+        'results': results
+    }, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Export the served model and scaler pickles as a single model bundle
+
+    python export_bundle.py [--model-dir model] [--version lr-2026-10-17]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from model_bundle import BUNDLE_FILE, write_bundle
+from model_loader import load_pickles, pickle_digest
+from schema import FEATURE_NAMES
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export model_final.pkl + scaler_final.pkl as a model bundle')
+    parser.add_argument('--model-dir', default=str(Path(__file__).parent / 'model'))
+    parser.add_argument('--version', help='version label (defaults to a checksum-derived id)')
+    parser.add_argument('--data', default=str(Path(__file__).parent.parent / 'data' / 'heart_clean.csv'),
+                        help='dataset used to check the bundle against sklearn')
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    model, scaler = load_pickles(model_dir)
+
+    check_data = None
+    if Path(args.data).exists():
+        check_data = np.loadtxt(args.data, delimiter=',', skiprows=1, ndmin=2)[:, :len(FEATURE_NAMES)]
+
+    feature_names = list(getattr(scaler, 'feature_names_in_', FEATURE_NAMES))
+    header = write_bundle(model_dir / BUNDLE_FILE, model, scaler, feature_names, args.version, check_data,
+                          pickle_sha256=pickle_digest(model_dir))
+    print(f"✅ Wrote {model_dir / BUNDLE_FILE} (version {header['version']}, "
+          f"parity max diff {header['parity_max_abs_diff']:.2e})")
+
+
+if __name__ == '__main__':
+    main()
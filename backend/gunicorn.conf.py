@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for the Heart Disease Prediction API
+
+The app is preloaded in the master so the model and scaler are loaded once
+and shared copy-on-write by every forked worker. Workers publish their
+metrics to METRICS_MULTIPROC_DIR so /metrics reports all of them, whichever
+worker answers the scrape.
+"""
+
+import gc
+import multiprocessing
+import os
+import tempfile
+from pathlib import Path
+
+# Make `app`, `models` etc. importable the same way as when running app/app.py
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+wsgi_app = 'app:create_app()'
+
+# Read by the app when it is loaded; a fresh directory per server so old runs are never counted
+os.environ.setdefault('METRICS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='heart-metrics-'))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically to bound any slow leaks (0 disables)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # Move preloaded objects out of the GC's reach so collections in the
+    # workers don't touch (and copy) the shared pages
+    gc.freeze()
+
+
+def on_starting(server):
+    # Snapshots left in a configured directory by a previous server would be added to this one's totals
+    metrics_dir = Path(os.environ['METRICS_MULTIPROC_DIR'])
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    for path in metrics_dir.glob('*.json'):
+        path.unlink()
+
+
+def child_exit(server, worker):
+    # Keep an exited worker's counts in the merged totals
+    from metrics import mark_process_dead
+
+    mark_process_dead(os.environ['METRICS_MULTIPROC_DIR'], worker.pid)
@@ -11,8 +11,11 @@ from pathlib import Path
 app_dir = Path(__file__).parent / 'app'
 sys.path.insert(0, str(app_dir))
 
-from app import app, db
+from app import create_app, db
 from models import User, Prediction
+import stats_rollup
+
+app = create_app()
 
 def init_database():
     """Initialize the database with tables"""
@@ -26,6 +29,7 @@ def init_database():
             print("\n📊 Created tables:")
             print("- users: Store user sessions")
             print("- predictions: Store prediction inputs and results")
+            print("- prediction_stats_hourly: Hourly counters behind /stats")
             
             # Check if tables exist
             from sqlalchemy import inspect
@@ -78,6 +82,12 @@ def create_sample_data():
             )
             
             db.session.add(sample_prediction)
+            db.session.flush()
+            stats_rollup.record_new_users(1, sample_user.created_at)
+            stats_rollup.record_predictions([{
+                'created_at': sample_prediction.created_at,
+                'risk_level': sample_prediction.risk_level
+            }])
             db.session.commit()
             
             print("✅ Sample data created successfully!")
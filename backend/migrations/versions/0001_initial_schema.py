@@ -0,0 +1,61 @@
+"""Initial schema: users and predictions
+
+Revision ID: 0001_initial_schema
+Revises: 
+Create Date: 2026-10-17 09:00:00
+
+Databases created earlier with db.create_all() already have these tables;
+mark them with `flask db stamp 0001_initial_schema` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_id')
+    )
+    op.create_table(
+        'predictions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('age', sa.Float(), nullable=False),
+        sa.Column('sex', sa.Float(), nullable=False),
+        sa.Column('cp', sa.Float(), nullable=False),
+        sa.Column('trestbps', sa.Float(), nullable=False),
+        sa.Column('chol', sa.Float(), nullable=False),
+        sa.Column('fbs', sa.Float(), nullable=False),
+        sa.Column('restecg', sa.Float(), nullable=False),
+        sa.Column('thalach', sa.Float(), nullable=False),
+        sa.Column('exang', sa.Float(), nullable=False),
+        sa.Column('oldpeak', sa.Float(), nullable=False),
+        sa.Column('slope', sa.Float(), nullable=False),
+        sa.Column('ca', sa.Float(), nullable=False),
+        sa.Column('thal', sa.Float(), nullable=False),
+        sa.Column('prediction', sa.Integer(), nullable=False),
+        sa.Column('risk_percentage', sa.Float(), nullable=False),
+        sa.Column('risk_level', sa.String(length=50), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('predictions')
+    op.drop_table('users')
@@ -0,0 +1,28 @@
+"""Add predictions.public_id for client-visible prediction ids
+
+Revision ID: 0002_prediction_public_id
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 09:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_prediction_public_id'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.add_column(sa.Column('public_id', sa.String(length=36), nullable=True))
+        batch_op.create_unique_constraint('uq_predictions_public_id', ['public_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.drop_constraint('uq_predictions_public_id', type_='unique')
+        batch_op.drop_column('public_id')
@@ -0,0 +1,43 @@
+"""Index predictions for history and stats queries
+
+Revision ID: 0003_prediction_query_indexes
+Revises: 0002_prediction_public_id
+Create Date: 2026-10-17 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_prediction_query_indexes'
+down_revision = '0002_prediction_public_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY keeps Postgres accepting writes to predictions while the indexes build, and cannot
+    # run inside a transaction; SQLite ignores both
+    with op.get_context().autocommit_block():
+        # /history and /export: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        op.create_index(
+            'ix_predictions_user_id_created_at',
+            'predictions',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True
+        )
+        # /stats time windows; BRIN on Postgres since rows are appended in time order
+        op.create_index(
+            'ix_predictions_created_at',
+            'predictions',
+            ['created_at'],
+            postgresql_using='brin',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_predictions_created_at', table_name='predictions', postgresql_concurrently=True)
+        op.drop_index('ix_predictions_user_id_created_at', table_name='predictions', postgresql_concurrently=True)
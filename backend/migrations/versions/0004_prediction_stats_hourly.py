@@ -0,0 +1,65 @@
+"""Hourly prediction stats rollup for /stats
+
+Revision ID: 0004_prediction_stats_hourly
+Revises: 0003_prediction_query_indexes
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_prediction_stats_hourly'
+down_revision = '0003_prediction_query_indexes'
+branch_labels = None
+depends_on = None
+
+# Truncate a timestamp to the hour, producing the same value the app writes
+HOUR_BUCKET_SQL = {
+    'postgresql': "date_trunc('hour', {column})",
+    'sqlite': "strftime('%Y-%m-%d %H:00:00.000000', {column})"
+}
+
+BACKFILL_SQL = """
+INSERT INTO prediction_stats_hourly
+    (bucket_start, new_users, predictions, low_risk, moderate_risk, high_risk)
+SELECT bucket_start, SUM(new_users), SUM(predictions), SUM(low_risk), SUM(moderate_risk), SUM(high_risk)
+FROM (
+    SELECT {prediction_bucket} AS bucket_start, 0 AS new_users, 1 AS predictions,
+           CASE WHEN risk_level = 'Low' THEN 1 ELSE 0 END AS low_risk,
+           CASE WHEN risk_level = 'Moderate' THEN 1 ELSE 0 END AS moderate_risk,
+           CASE WHEN risk_level = 'High' THEN 1 ELSE 0 END AS high_risk
+    FROM predictions WHERE created_at IS NOT NULL
+    UNION ALL
+    SELECT {user_bucket}, 1, 0, 0, 0, 0
+    FROM users WHERE created_at IS NOT NULL
+) AS events
+GROUP BY bucket_start
+"""
+
+
+def upgrade():
+    op.create_table(
+        'prediction_stats_hourly',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('new_users', sa.Integer(), nullable=False),
+        sa.Column('predictions', sa.Integer(), nullable=False),
+        sa.Column('low_risk', sa.Integer(), nullable=False),
+        sa.Column('moderate_risk', sa.Integer(), nullable=False),
+        sa.Column('high_risk', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket_start')
+    )
+
+    bucket_sql = HOUR_BUCKET_SQL.get(op.get_bind().dialect.name)
+    if bucket_sql is None:
+        print("⚠️ Skipping stats backfill for this database; run `flask rebuild-stats`")
+        return
+    op.execute(BACKFILL_SQL.format(
+        prediction_bucket=bucket_sql.format(column='predictions.created_at'),
+        user_bucket=bucket_sql.format(column='users.created_at')
+    ))
+
+
+def downgrade():
+    op.drop_table('prediction_stats_hourly')
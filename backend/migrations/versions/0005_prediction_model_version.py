@@ -0,0 +1,26 @@
+"""Record the model version that produced each prediction
+
+Revision ID: 0005_prediction_model_version
+Revises: 0004_prediction_stats_hourly
+Create Date: 2026-10-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_prediction_model_version'
+down_revision = '0004_prediction_stats_hourly'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.add_column(sa.Column('model_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.drop_column('model_version')
@@ -0,0 +1,40 @@
+"""Store challenger model outputs for shadow and A/B evaluation
+
+Revision ID: 0006_shadow_predictions
+Revises: 0005_prediction_model_version
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_shadow_predictions'
+down_revision = '0005_prediction_model_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'shadow_predictions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prediction_id', sa.String(length=36), nullable=True),
+        sa.Column('mode', sa.String(length=16), nullable=False),
+        sa.Column('served_version', sa.String(length=64), nullable=True),
+        sa.Column('served_prediction', sa.Integer(), nullable=False),
+        sa.Column('served_risk_percentage', sa.Float(), nullable=False),
+        sa.Column('shadow_version', sa.String(length=64), nullable=True),
+        sa.Column('shadow_prediction', sa.Integer(), nullable=False),
+        sa.Column('shadow_risk_percentage', sa.Float(), nullable=False),
+        sa.Column('shadow_latency_ms', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_shadow_predictions_prediction_id', 'shadow_predictions', ['prediction_id'])
+
+
+def downgrade():
+    op.drop_index('ix_shadow_predictions_prediction_id', table_name='shadow_predictions')
+    op.drop_table('shadow_predictions')
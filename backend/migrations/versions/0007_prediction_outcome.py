@@ -0,0 +1,36 @@
+"""Store follow-up outcomes on predictions for incremental training
+
+Revision ID: 0007_prediction_outcome
+Revises: 0006_shadow_predictions
+Create Date: 2026-10-17 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_prediction_outcome'
+down_revision = '0006_shadow_predictions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.add_column(sa.Column('outcome', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('outcome_recorded_at', sa.DateTime(), nullable=True))
+    # Built outside the transaction so Postgres keeps accepting writes to predictions meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_predictions_outcome_recorded_at', 'predictions', ['outcome_recorded_at'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_predictions_outcome_recorded_at', table_name='predictions', postgresql_concurrently=True)
+    with op.batch_alter_table('predictions') as batch_op:
+        batch_op.drop_column('outcome_recorded_at')
+        batch_op.drop_column('outcome')
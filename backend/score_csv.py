@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Score large extracts offline with the served model, in parallel and in constant memory
+
+Input is either a CSV in the data/heart.csv layout (the 13 features first, with
+or without a header row, '?' for missing values) or a .npy float64 matrix of
+the 13 features in training order, which is memory-mapped. The input is cut
+into fixed-size chunks: CSVs by byte range aligned to line boundaries, so
+workers read and parse their own slice of the file, and .npy files by row
+range. Each chunk is validated and scored as one NumPy matrix on a process
+pool whose workers load the model once. Results are written in input order
+with at most --workers * 2 chunks in flight, so memory does not grow with the
+input size.
+
+The output has one line per input row: risk_percentage,risk_level as served
+by /predict, or two empty fields for rows with missing or out-of-range values.
+
+    python score_csv.py ../data/heart.csv --output scores.csv
+    python score_csv.py extract.npy --output scores.csv --workers 16 --chunk-rows 500000
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from model_loader import load_model
+from schema import FEATURE_NAMES, RECORD_SCHEMA
+
+OUTPUT_HEADER = b'risk_percentage,risk_level\n'
+# Same bands as app.get_risk_level: below 30 Low, below 70 Moderate, otherwise High
+RISK_BOUNDS = np.array([30.0, 70.0])
+RISK_LEVELS = ('Low', 'Moderate', 'High')
+# Every possible output line, indexed by level * 10001 + hundredths of a percent, then the invalid-row line;
+# formatting a chunk is one fancy-indexing pass and a join instead of a format call per row
+OUTPUT_LINES = np.array(
+    [f'{hundredths / 100:.2f},{level}\n'.encode() for level in RISK_LEVELS for hundredths in range(10001)]
+    + [b',\n'],
+    dtype=object
+)
+INVALID_LINE = len(OUTPUT_LINES) - 1
+
+# Set in each worker by init_worker
+_model = None
+
+
+def init_worker(model_dir):
+    """Load the model once per worker process"""
+    global _model
+    _model = load_model([Path(model_dir)] if model_dir else None, FEATURE_NAMES)
+    if _model is None:
+        raise RuntimeError(f'No model found in {model_dir or "the default model directories"}')
+
+
+def score_matrix(features_array):
+    """(rows, invalid rows, output bytes) for a feature matrix; invalid rows get empty fields"""
+    valid = RECORD_SCHEMA.valid_rows(features_array)
+    risk = np.full(len(features_array), np.nan)
+    if valid.any():
+        _, probabilities = _model.predict_matrix(features_array[valid])
+        risk[valid] = probabilities[:, 1] * 100
+
+    # Percentages are rounded like the API's round(risk, 2); np.rint of the scaled value only
+    # disagrees with it next to a tie, so those few rows are redone with round()
+    scaled = np.nan_to_num(risk) * 100
+    hundredths = np.rint(scaled)
+    ties = np.flatnonzero(np.abs(scaled % 1 - 0.5) < 1e-6)
+    hundredths[ties] = [round(round(value, 2) * 100) for value in risk[ties].tolist()]
+    # The level comes from the unrounded risk, like the API's
+    keys = np.digitize(risk, RISK_BOUNDS) * 10001 + hundredths.astype(np.intp)
+    keys[~valid] = INVALID_LINE
+    return len(keys), int(len(keys) - valid.sum()), b''.join(OUTPUT_LINES[keys].tolist())
+
+
+def score_csv_range(path, start, end, columns):
+    """Parse and score the CSV lines in bytes [start, end)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Blank lines are kept as all-missing rows so the output stays one line per input line; read_csv
+    # takes the column count from the first line, so leading blank lines are counted here instead
+    body = data.lstrip(b'\r\n')
+    leading = np.full((data[:len(data) - len(body)].count(b'\n'), len(columns)), np.nan)
+    if not body:
+        return score_matrix(leading)
+    try:
+        frame = pd.read_csv(io.BytesIO(body), header=None, usecols=columns, na_values=['?'], dtype=np.float64,
+                            skip_blank_lines=False)
+    except ValueError:
+        # Some field is not a number: parse as text and let it fail validation like a missing value
+        frame = pd.read_csv(io.BytesIO(body), header=None, usecols=columns, dtype=str, skip_blank_lines=False)
+        frame = frame.apply(pd.to_numeric, errors='coerce')
+    return score_matrix(np.vstack([leading, frame[columns].to_numpy(dtype=np.float64)]))
+
+
+def score_npy_range(path, start, end):
+    """Score rows [start, end) of a memory-mapped .npy feature matrix"""
+    features_array = np.load(path, mmap_mode='r')[start:end]
+    return score_matrix(np.asarray(features_array, dtype=np.float64))
+
+
+def csv_layout(path):
+    """(data start offset, feature column indices) from the first line of a CSV"""
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+    fields = first_line.decode('utf-8').strip().split(',')
+    try:
+        [float(field) for field in fields if field.strip() != '?']
+    except ValueError:
+        # A header: find the features by name, e.g. heart_clean.csv
+        names = [field.strip() for field in fields]
+        missing = [name for name in FEATURE_NAMES if name not in names]
+        if missing:
+            raise ValueError(f'Columns missing from {path}: {missing}')
+        return len(first_line), [names.index(name) for name in FEATURE_NAMES]
+    if len(fields) < len(FEATURE_NAMES):
+        raise ValueError(f'{path} has {len(fields)} columns, expected at least {len(FEATURE_NAMES)}')
+    return 0, list(range(len(FEATURE_NAMES)))
+
+
+def csv_ranges(path, start, chunk_bytes):
+    """Byte ranges of about chunk_bytes each, every one ending just after a newline"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def npy_ranges(path, chunk_rows):
+    features_array = np.load(path, mmap_mode='r')
+    if features_array.ndim != 2 or features_array.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f'{path} holds a {features_array.shape} array, expected (rows, {len(FEATURE_NAMES)})')
+    rows = features_array.shape[0]
+    for start in range(0, rows, chunk_rows):
+        yield start, min(start + chunk_rows, rows)
+
+
+def run_ordered(executor, function, tasks, window):
+    """Like executor.map, but with at most `window` tasks submitted ahead of the one being consumed"""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(function, *task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class InlineExecutor:
+    """Runs tasks in this process, for --workers 1"""
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='CSV in the data/heart.csv layout, or a .npy float64 feature matrix')
+    parser.add_argument('--output', required=True, help='CSV of risk_percentage,risk_level, one line per row')
+    parser.add_argument('--model-dir', help='directory with model_bundle.bin or the pickles (default: as the API)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='scoring processes')
+    parser.add_argument('--chunk-bytes', type=int, default=16 * 1024 * 1024, help='CSV bytes per chunk')
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000, help='.npy rows per chunk')
+    parser.add_argument('--no-header', action='store_true', help='do not write the output header line')
+    args = parser.parse_args()
+
+    path = str(Path(args.input).resolve())
+    if path.endswith('.npy'):
+        function = score_npy_range
+        tasks = ((path, start, end) for start, end in npy_ranges(path, args.chunk_rows))
+    else:
+        data_start, columns = csv_layout(path)
+        function = score_csv_range
+        tasks = ((path, start, end, columns) for start, end in csv_ranges(path, data_start, args.chunk_bytes))
+
+    output_path = Path(args.output)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    started = time.perf_counter()
+    rows = invalid = chunks = 0
+
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.model_dir,))
+    else:
+        init_worker(args.model_dir)
+        executor = InlineExecutor()
+    try:
+        with open(tmp_path, 'wb') as out:
+            if not args.no_header:
+                out.write(OUTPUT_HEADER)
+            for chunk_rows, chunk_invalid, output in run_ordered(executor, function, tasks, max(args.workers, 1) * 2):
+                out.write(output)
+                rows += chunk_rows
+                invalid += chunk_invalid
+                chunks += 1
+                if chunks % 10 == 0:
+                    print(f"⏳ {rows} rows scored", file=sys.stderr)
+        os.replace(tmp_path, output_path)
+    finally:
+        if isinstance(executor, ProcessPoolExecutor):
+            executor.shutdown(cancel_futures=True)
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {rows} rows ({invalid} invalid) into {output_path} in {elapsed:.1f}s", file=sys.stderr)
+    print(json.dumps({
+        'input': path,
+        'output': str(output_path),
+        'rows': rows,
+        'invalid_rows': invalid,
+        'chunks': chunks,
+        'workers': args.workers,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else None
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
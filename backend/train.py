@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Train, select and export the served heart disease model
+
+Runs a cross-validated grid search over the LogisticRegression and
+RandomForestClassifier candidates on a process pool, evaluates the winner on a
+held-out split and writes the artifacts the API loads (model_final.pkl,
+scaler_final.pkl and, for logistic regression, model_bundle.bin) plus
+training_report.json.
+
+Scaled training folds are cached on disk with joblib.Memory, so every
+hyperparameter setting and candidate reuses the same preprocessed folds, and
+re-runs on unchanged data skip preprocessing entirely.
+
+    python train.py                                   # data/heart_clean.csv -> model/
+    python train.py --data site_a.csv --data site_b.csv --n-jobs 8 --output-dir /tmp/candidate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    accuracy_score, confusion_matrix, f1_score, precision_score, recall_score, roc_auc_score
+)
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from inference import FoldedLogisticModel
+from model_bundle import BUNDLE_FILE, write_bundle
+from model_loader import MODEL_FILE, SCALER_FILE, pickle_digest, pickle_version
+from schema import FEATURE_NAMES
+
+TARGET = 'target'
+REPORT_FILE = 'training_report.json'
+SCORING = ('roc_auc', 'accuracy', 'f1')
+
+CANDIDATES = {
+    'lr': (
+        LogisticRegression(max_iter=1000),
+        {'model__C': [0.01, 0.1, 1.0, 10.0], 'model__class_weight': [None, 'balanced']}
+    ),
+    'rf': (
+        # The search itself is parallel, so each forest is built on a single core
+        RandomForestClassifier(random_state=42, n_jobs=1),
+        {'model__n_estimators': [200, 500], 'model__max_depth': [None, 5, 10], 'model__min_samples_leaf': [1, 3]}
+    )
+}
+
+
+def load_dataset(paths):
+    """Concatenate one or more CSVs in the heart_clean.csv layout"""
+    frames = []
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+        frame = pd.read_csv(path, usecols=FEATURE_NAMES + [TARGET])
+        frames.append(frame)
+    data = pd.concat(frames, ignore_index=True).dropna()
+    # Plain arrays: the API scores numpy rows, so the scaler must not be fitted with column names
+    return data[FEATURE_NAMES].to_numpy(dtype=np.float64), data[TARGET].to_numpy(dtype=int), digest.hexdigest()
+
+
+def search_candidate(name, X_train, y_train, cv, n_jobs, memory, scoring):
+    """Grid search one candidate; returns the fitted search and a summary"""
+    estimator, grid = CANDIDATES[name]
+    # With memory set, each fold's fitted scaler and scaled X are computed once and reused by every setting
+    pipeline = Pipeline([('scaler', StandardScaler()), ('model', estimator)], memory=memory)
+    search = GridSearchCV(pipeline, grid, scoring=list(SCORING), refit=scoring, cv=cv, n_jobs=n_jobs)
+
+    started = time.perf_counter()
+    search.fit(X_train, y_train)
+    elapsed = time.perf_counter() - started
+
+    results = search.cv_results_
+    settings = [
+        {
+            'params': {key.replace('model__', ''): value for key, value in params.items()},
+            **{f'mean_{metric}': round(float(results[f'mean_test_{metric}'][i]), 4) for metric in SCORING},
+            f'std_{scoring}': round(float(results[f'std_test_{scoring}'][i]), 4)
+        }
+        for i, params in enumerate(results['params'])
+    ]
+    settings.sort(key=lambda setting: setting[f'mean_{scoring}'], reverse=True)
+    summary = {
+        'best_params': {key.replace('model__', ''): value for key, value in search.best_params_.items()},
+        f'best_cv_{scoring}': round(float(search.best_score_), 4),
+        'fits': len(settings) * cv.get_n_splits(),
+        'search_seconds': round(elapsed, 3),
+        'settings': settings
+    }
+    print(f"🔍 {name}: best CV {scoring} {summary[f'best_cv_{scoring}']} with {summary['best_params']} "
+          f"({summary['fits']} fits, {elapsed:.1f}s)", file=sys.stderr)
+    return search, summary
+
+
+def holdout_metrics(pipeline, X_test, y_test):
+    probabilities = pipeline.predict_proba(X_test)[:, 1]
+    predictions = pipeline.predict(X_test)
+    return {
+        'rows': int(len(y_test)),
+        'roc_auc': round(float(roc_auc_score(y_test, probabilities)), 4),
+        'accuracy': round(float(accuracy_score(y_test, predictions)), 4),
+        'f1': round(float(f1_score(y_test, predictions)), 4),
+        'precision': round(float(precision_score(y_test, predictions)), 4),
+        'recall': round(float(recall_score(y_test, predictions)), 4),
+        'confusion_matrix': confusion_matrix(y_test, predictions).tolist()
+    }
+
+
+def dump_atomic(value, path):
+    # The API hot-reloads on file changes, so never expose a half-written pickle
+    tmp_path = path.with_name(path.name + '.tmp')
+    joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_artifacts(output_dir, pipeline, X_check, version):
+    """Write the served pickles and, when the model can be bundled, model_bundle.bin; returns (version, path)"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scaler = pipeline.named_steps['scaler']
+    model = pipeline.named_steps['model']
+
+    dump_atomic(model, output_dir / MODEL_FILE)
+    dump_atomic(scaler, output_dir / SCALER_FILE)
+
+    bundle_path = output_dir / BUNDLE_FILE
+    if FoldedLogisticModel.from_sklearn(model, scaler) is not None:
+        header = write_bundle(bundle_path, model, scaler, FEATURE_NAMES, version, check_data=X_check,
+                              pickle_sha256=pickle_digest(output_dir))
+        return header['version'], str(bundle_path)
+
+    # The API prefers the bundle, so a stale one would keep serving the previous model
+    if bundle_path.exists():
+        bundle_path.unlink()
+        print(f"⚠️ Removed {bundle_path}: {type(model).__name__} is served from the pickles", file=sys.stderr)
+    return pickle_version(output_dir), str(output_dir / MODEL_FILE)
+
+
+def main():
+    backend_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', action='append',
+                        help='training CSV (repeatable; default: data/heart_clean.csv)')
+    parser.add_argument('--output-dir', default=str(backend_dir / 'model'), help='where artifacts are written')
+    parser.add_argument('--candidates', default=','.join(CANDIDATES),
+                        help=f"comma-separated candidates to search ({', '.join(CANDIDATES)})")
+    parser.add_argument('--scoring', choices=SCORING, default='roc_auc', help='metric used to select the model')
+    parser.add_argument('--cv', type=int, default=5, help='cross-validation folds')
+    parser.add_argument('--test-size', type=float, default=0.2, help='held-out share for the final evaluation')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel fits (-1 = all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=str(backend_dir / '.cache' / 'train'),
+                        help='joblib.Memory cache for preprocessed folds')
+    parser.add_argument('--no-cache', action='store_true', help='do not cache preprocessed folds')
+    parser.add_argument('--version', help='version label for the bundle (defaults to a checksum-derived id)')
+    parser.add_argument('--dry-run', action='store_true', help='report only, do not write model artifacts')
+    args = parser.parse_args()
+
+    candidates = [name.strip() for name in args.candidates.split(',') if name.strip()]
+    unknown = [name for name in candidates if name not in CANDIDATES]
+    if unknown or not candidates:
+        parser.error(f'unknown candidates: {unknown}')
+
+    data_paths = args.data or [str(backend_dir.parent / 'data' / 'heart_clean.csv')]
+    X, y, data_sha256 = load_dataset(data_paths)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, stratify=y, random_state=args.seed
+    )
+    cv = StratifiedKFold(n_splits=args.cv, shuffle=True, random_state=args.seed)
+    memory = None if args.no_cache else joblib.Memory(args.cache_dir, verbose=0)
+
+    started = time.perf_counter()
+    searches = {}
+    summaries = {}
+    for name in candidates:
+        searches[name], summaries[name] = search_candidate(
+            name, X_train, y_train, cv, args.n_jobs, memory, args.scoring
+        )
+    best_name = max(candidates, key=lambda name: summaries[name][f'best_cv_{args.scoring}'])
+    best_pipeline = searches[best_name].best_estimator_
+    holdout = holdout_metrics(best_pipeline, X_test, y_test)
+    print(f"🏆 Selected {best_name}: holdout {args.scoring} {holdout[args.scoring]}, "
+          f"accuracy {holdout['accuracy']}", file=sys.stderr)
+
+    output_dir = Path(args.output_dir)
+    version, artifact = (None, None)
+    if not args.dry_run:
+        version, artifact = write_artifacts(output_dir, best_pipeline, X, args.version)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'version': version,
+        'artifact': artifact,
+        'selected': best_name,
+        'model_type': type(best_pipeline.named_steps['model']).__name__,
+        'scoring': args.scoring,
+        'holdout': holdout,
+        'candidates': summaries,
+        'data': {
+            'sources': data_paths,
+            'sha256': data_sha256,
+            'rows': int(len(y)),
+            'train_rows': int(len(y_train)),
+            'positive_rate': round(float(y.mean()), 4),
+            'feature_names': FEATURE_NAMES
+        },
+        'settings': {
+            'cv_folds': args.cv,
+            'test_size': args.test_size,
+            'seed': args.seed,
+            'n_jobs': args.n_jobs,
+            'cache_dir': None if memory is None else args.cache_dir
+        },
+        'sklearn_version': sklearn.__version__,
+        'total_seconds': round(time.perf_counter() - started, 3)
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if not args.dry_run:
+        (output_dir / REPORT_FILE).write_text(output + '\n')
+        print(f"✅ Wrote {best_name} model {version} and {REPORT_FILE} to {output_dir}", file=sys.stderr)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
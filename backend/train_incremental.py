@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Incrementally train the served model from labeled rows, out of core
+
+Streams labeled rows in chunks from the predictions table (rows whose follow-up
+outcome has been recorded through POST /admin/outcomes), from the
+prediction archive or from CSV files, so memory stays bounded by --chunk-size
+whatever the size of the data. A first pass fits the StandardScaler with
+partial_fit, then each epoch re-reads the source and updates an SGDClassifier
+(logistic loss) with partial_fit. Rows whose id falls in the holdout slice are
+never trained on and are scored after the last epoch.
+
+The result is written like train.py's: model_final.pkl, scaler_final.pkl,
+model_bundle.bin and training_report.json, which the API picks up on reload.
+
+    python train_incremental.py                                   # predictions table (DATABASE_URL)
+    python train_incremental.py --source archive --since 2026-09-01 --warm-start model/
+    python train_incremental.py --source csv --data big.csv --chunk-size 50000 --epochs 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Add the app directory to Python path
+app_dir = Path(__file__).parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from model_loader import load_pickles
+from schema import FEATURE_NAMES
+from train import REPORT_FILE, TARGET, write_artifacts
+
+SOURCES = ('db', 'archive', 'csv')
+LABEL = 'outcome'
+# Probabilities are clipped like sklearn's log_loss so one confident miss cannot make it infinite
+EPSILON = np.finfo(np.float64).eps
+
+
+def make_app():
+    """A bare Flask app with the API's configuration, without starting its background workers"""
+    from flask import Flask
+    from app import load_config
+
+    app = Flask('train_incremental')
+    load_config(app)
+    return app
+
+
+def db_chunks(chunk_size, since=None):
+    """(ids, X, y) chunks of labeled predictions, read by id keyset so no chunk rescans earlier rows"""
+    from models import db, Prediction
+
+    app = make_app()
+    db.init_app(app)
+
+    table = Prediction.__table__
+    columns = [table.c.id] + [table.c[name] for name in FEATURE_NAMES] + [table.c[LABEL]]
+    with app.app_context():
+        last_id = 0
+        while True:
+            query = (
+                db.select(*columns)
+                .where(table.c[LABEL].is_not(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            )
+            if since is not None:
+                query = query.where(table.c.outcome_recorded_at >= since)
+            rows = db.session.execute(query).all()
+            if not rows:
+                break
+            values = np.array(rows, dtype=np.float64)
+            last_id = int(values[-1, 0])
+            yield values[:, 0].astype(np.int64), values[:, 1:-1], values[:, -1].astype(int)
+        db.session.remove()
+
+
+def archive_chunks(chunk_size, since=None):
+    """(ids, X, y) chunks of labeled rows from the columnar prediction archive"""
+    import pyarrow.dataset as ds
+    from archive import open_archive
+
+    dataset = open_archive(make_app().config['ARCHIVE_DIR'])
+    if dataset is None:
+        return
+
+    # Archived rows keep their outcome but not when it was recorded, so --since filters on creation time
+    expression = ds.field(LABEL).is_valid()
+    if since is not None:
+        expression = expression & (ds.field('created_at') >= since)
+    for batch in dataset.to_batches(columns=['id'] + FEATURE_NAMES + [LABEL], filter=expression,
+                                    batch_size=chunk_size):
+        if batch.num_rows == 0:
+            continue
+        frame = batch.to_pandas()
+        yield (frame['id'].to_numpy(dtype=np.int64), frame[FEATURE_NAMES].to_numpy(dtype=np.float64),
+               frame[LABEL].to_numpy(dtype=int))
+
+
+def csv_chunks(paths, chunk_size):
+    """(ids, X, y) chunks from CSVs in the heart_clean.csv layout; ids are running row numbers"""
+    offset = 0
+    for path in paths:
+        for frame in pd.read_csv(path, usecols=FEATURE_NAMES + [TARGET], chunksize=chunk_size):
+            frame = frame.dropna()
+            ids = np.arange(offset, offset + len(frame), dtype=np.int64)
+            offset += len(frame)
+            yield ids, frame[FEATURE_NAMES].to_numpy(dtype=np.float64), frame[TARGET].to_numpy(dtype=int)
+
+
+class StreamingScore:
+    """Accuracy, log loss and confusion counts accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.rows = 0
+        self.log_loss_sum = 0.0
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+
+    def update(self, y, probabilities):
+        p = np.clip(probabilities, EPSILON, 1 - EPSILON)
+        self.log_loss_sum += float(-np.sum(y * np.log(p) + (1 - y) * np.log(1 - p)))
+        np.add.at(self.confusion, (y, (probabilities >= 0.5).astype(int)), 1)
+        self.rows += len(y)
+
+    def summary(self):
+        if not self.rows:
+            return {'rows': 0}
+        (tn, fp), (fn, tp) = self.confusion.tolist()
+        return {
+            'rows': self.rows,
+            'accuracy': round((tp + tn) / self.rows, 4),
+            'log_loss': round(self.log_loss_sum / self.rows, 4),
+            'precision': round(tp / (tp + fp), 4) if tp + fp else 0.0,
+            'recall': round(tp / (tp + fn), 4) if tp + fn else 0.0,
+            'confusion_matrix': self.confusion.tolist()
+        }
+
+
+def main():
+    backend_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', choices=SOURCES, default='db', help='where labeled rows are read from')
+    parser.add_argument('--data', action='append', help='training CSV for --source csv (repeatable)')
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        help='only rows labeled (db) or created (archive) on or after this ISO date')
+    parser.add_argument('--output-dir', default=str(backend_dir / 'model'), help='where artifacts are written')
+    parser.add_argument('--warm-start', metavar='MODEL_DIR',
+                        help='continue from the SGDClassifier in this directory, keeping its scaler')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows held in memory at a time')
+    parser.add_argument('--epochs', type=int, default=5, help='passes of partial_fit over the data')
+    parser.add_argument('--alpha', type=float, default=1e-4, help='SGDClassifier L2 regularization')
+    parser.add_argument('--eta0', type=float, default=0.01, help='SGDClassifier step size')
+    parser.add_argument('--holdout-every', type=int, default=10,
+                        help='rows whose id is a multiple of this are held out for evaluation (0 = none)')
+    parser.add_argument('--min-accuracy', type=float, default=float(os.getenv('MODEL_MIN_ACCURACY', '0.7')),
+                        help='do not publish unless holdout accuracy reaches this')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--version', help='version label for the bundle (defaults to a checksum-derived id)')
+    parser.add_argument('--dry-run', action='store_true', help='report only, do not write model artifacts')
+    args = parser.parse_args()
+
+    if args.source == 'csv' and not args.data:
+        parser.error('--source csv needs --data')
+
+    def chunks():
+        if args.source == 'db':
+            return db_chunks(args.chunk_size, args.since)
+        if args.source == 'archive':
+            return archive_chunks(args.chunk_size, args.since)
+        return csv_chunks(args.data, args.chunk_size)
+
+    def split(ids):
+        if args.holdout_every <= 0:
+            return np.zeros(len(ids), dtype=bool)
+        return ids % args.holdout_every == 0
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(args.seed)
+
+    if args.warm_start:
+        model, scaler = load_pickles(Path(args.warm_start))
+        if not isinstance(model, SGDClassifier):
+            sys.exit(f"❌ --warm-start needs an SGDClassifier, {args.warm_start} holds {type(model).__name__}")
+        print(f"♻️ Continuing from {args.warm_start} with its scaler unchanged", file=sys.stderr)
+    else:
+        # A constant step keeps later chunks as influential as the first ones, which the default schedule does not
+        model = SGDClassifier(
+            loss='log_loss', alpha=args.alpha, learning_rate='constant', eta0=args.eta0, random_state=args.seed
+        )
+        scaler = StandardScaler()
+        for ids, X, y in chunks():
+            train_rows = ~split(ids)
+            if train_rows.any():
+                scaler.partial_fit(X[train_rows])
+        if not hasattr(scaler, 'mean_'):
+            sys.exit(f"❌ No labeled training rows found in {args.source}")
+
+    train_rows_seen = 0
+    check_data = None
+    for epoch in range(args.epochs):
+        epoch_started = time.perf_counter()
+        epoch_rows = 0
+        for ids, X, y in chunks():
+            train_rows = ~split(ids)
+            if not train_rows.any():
+                continue
+            X_train, y_train = X[train_rows], y[train_rows]
+            if check_data is None:
+                check_data = X_train[:100]
+            # SGD assumes shuffled input; chunks come in id order, so shuffle within each one
+            order = rng.permutation(len(y_train))
+            model.partial_fit(scaler.transform(X_train[order]), y_train[order], classes=[0, 1])
+            epoch_rows += len(y_train)
+        if not epoch_rows:
+            sys.exit(f"❌ No labeled training rows found in {args.source}")
+        train_rows_seen = epoch_rows
+        print(f"🔁 Epoch {epoch + 1}/{args.epochs}: {epoch_rows} rows in "
+              f"{time.perf_counter() - epoch_started:.1f}s", file=sys.stderr)
+
+    score = StreamingScore()
+    if args.holdout_every > 0:
+        for ids, X, y in chunks():
+            holdout_rows = split(ids)
+            if holdout_rows.any():
+                score.update(y[holdout_rows], model.predict_proba(scaler.transform(X[holdout_rows]))[:, 1])
+    holdout = score.summary()
+    if holdout['rows']:
+        print(f"📊 Holdout accuracy {holdout['accuracy']}, log loss {holdout['log_loss']} "
+              f"on {holdout['rows']} rows", file=sys.stderr)
+    else:
+        print("⚠️ No holdout rows, publishing without evaluation", file=sys.stderr)
+
+    passed = not holdout['rows'] or holdout['accuracy'] >= args.min_accuracy
+    output_dir = Path(args.output_dir)
+    version, artifact = (None, None)
+    if not passed:
+        print(f"❌ Holdout accuracy {holdout['accuracy']} is below {args.min_accuracy}, not publishing",
+              file=sys.stderr)
+    elif not args.dry_run:
+        pipeline = Pipeline([('scaler', scaler), ('model', model)])
+        version, artifact = write_artifacts(output_dir, pipeline, check_data, args.version)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'mode': 'incremental',
+        'version': version,
+        'artifact': artifact,
+        'published': version is not None,
+        'model_type': type(model).__name__,
+        'holdout': holdout,
+        'min_accuracy': args.min_accuracy,
+        'data': {
+            'source': args.source,
+            'sources': args.data if args.source == 'csv' else None,
+            'since': args.since,
+            'train_rows': train_rows_seen,
+            'feature_names': FEATURE_NAMES
+        },
+        'settings': {
+            'chunk_size': args.chunk_size,
+            'epochs': args.epochs,
+            'alpha': model.alpha,
+            'eta0': model.eta0,
+            'holdout_every': args.holdout_every,
+            'warm_start': args.warm_start,
+            'seed': args.seed
+        },
+        'sklearn_version': sklearn.__version__,
+        'total_seconds': round(time.perf_counter() - started, 3)
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if version is not None:
+        (output_dir / REPORT_FILE).write_text(output + '\n')
+        print(f"✅ Wrote incremental model {version} and {REPORT_FILE} to {output_dir}", file=sys.stderr)
+    print(output)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,13 @@ import axios from 'axios';
 import './HistoryPanel.css';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+const HISTORY_PAGE_SIZE = 20;
 
 const HistoryPanel = ({ isOpen, onClose }) => {
   const [history, setHistory] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
@@ -26,8 +29,11 @@ const HistoryPanel = ({ isOpen, onClose }) => {
         return;
       }
 
-      const response = await axios.get(`${API_BASE_URL}/history/${sessionId}`);
+      const response = await axios.get(`${API_BASE_URL}/history/${sessionId}`, {
+        params: { limit: HISTORY_PAGE_SIZE }
+      });
       setHistory(response.data);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error loading history:', error);
       if (error.response?.status === 404) {
@@ -40,25 +46,40 @@ const HistoryPanel = ({ isOpen, onClose }) => {
     }
   };
 
-  const exportData = async () => {
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+
     try {
       const sessionId = localStorage.getItem('heart_prediction_session');
-      const response = await axios.get(`${API_BASE_URL}/export/${sessionId}`);
-      
-      // Create and download file
-      const dataStr = JSON.stringify(response.data, null, 2);
-      const dataBlob = new Blob([dataStr], { type: 'application/json' });
-      const url = URL.createObjectURL(dataBlob);
-      const link = document.createElement('a');
-      link.href = url;
-      link.download = `heart_prediction_history_${sessionId}.json`;
-      link.click();
-      URL.revokeObjectURL(url);
+      const response = await axios.get(`${API_BASE_URL}/history/${sessionId}`, {
+        params: { limit: HISTORY_PAGE_SIZE, cursor: nextCursor }
+      });
+      setHistory((previous) => ({
+        ...response.data,
+        predictions: [...previous.predictions, ...response.data.predictions]
+      }));
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
-      console.error('Export error:', error);
+      console.error('Error loading more history:', error);
+      setError('Failed to load more history. Please try again.');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
+  const exportData = () => {
+    const sessionId = localStorage.getItem('heart_prediction_session');
+    if (!sessionId) return;
+
+    // The streamed export is sent as an attachment, so the browser saves it to disk as it arrives
+    // instead of this page holding every prediction in memory
+    const link = document.createElement('a');
+    link.href = `${API_BASE_URL}/export/${encodeURIComponent(sessionId)}?format=ndjson`;
+    link.download = `heart_prediction_history_${sessionId}.ndjson`;
+    link.click();
+  };
+
   if (!isOpen) return null;
 
   return (
@@ -94,7 +115,7 @@ const HistoryPanel = ({ isOpen, onClose }) => {
               <div className="history-summary">
                 <div className="summary-card">
                   <h3>Session Summary</h3>
-                  <p><strong>Total Predictions:</strong> {history.predictions.length}</p>
+                  <p><strong>Total Predictions:</strong> {history.user.predictions_count}</p>
                   <p><strong>Session ID:</strong> {history.user.session_id}</p>
                   <p><strong>Started:</strong> {new Date(history.user.created_at).toLocaleString()}</p>
                   <button onClick={exportData} className="export-button">
@@ -130,6 +151,12 @@ const HistoryPanel = ({ isOpen, onClose }) => {
                     </div>
                   ))
                 )}
+                {nextCursor && (
+                  <button onClick={loadMore} className="export-button" disabled={loadingMore}>
+                    <i className="fas fa-chevron-down"></i>
+                    {loadingMore ? 'Loading...' : 'Load More'}
+                  </button>
+                )}
               </div>
             </>
           )}